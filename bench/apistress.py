@@ -0,0 +1,132 @@
+"""Nebenläufigkeits-Stresstest für die Zustandsmaschine des Simulators.
+
+Prüft zuerst, dass bei vielen gleichzeitigen Freigaben immer genau eine Sequenz je Stufe
+gewinnt, und misst danach den Durchsatz bei hoher Client-Nebenläufigkeit:
+
+    python -m bench.apistress --clients 64 --duration 10
+
+Zum Vergleich zweier Stände den Simulator jeweils neu starten und denselben Aufruf wiederholen;
+für Stände ohne Show-Namensräume `--prefix /api/sequences` angeben.
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+import httpx
+from collections import Counter
+
+
+# Statuswechsel, die der Lasttest zufällig auf die Sequenzen anwendet (dazu 'stop')
+CYCLE = ("first_stage", "second_stage", "running", "pause", "resume")
+
+
+async def prepare(client, prefix, count):
+    """Setzt die Show zurück und legt `count` Sequenzen an."""
+    await client.delete(prefix)
+    names = [f"Stress{i:04d}" for i in range(count)]
+    for name in names:
+        response = await client.post(prefix, params={"name": name})
+        response.raise_for_status()
+    return names
+
+
+async def race(client, prefix, names, rounds):
+    """Lässt alle Sequenzen gleichzeitig um jede Stufe konkurrieren; gibt die Zahl der Verstöße zurück."""
+    violations = 0
+    for _ in range(rounds):
+        await prepare(client, prefix, len(names))
+        for stage in ("first_stage", "second_stage", "running"):
+            responses = await asyncio.gather(
+                *(client.patch(f"{prefix}/{name}/{stage}") for name in names)
+            )
+            winners = [name for name, response in zip(names, responses) if response.status_code == 200]
+            holders = [s["name"] for s in (await client.get(prefix)).json() if s["status"] == stage]
+            # Ab der zweiten Stufe darf nur die Gewinnerin der vorherigen Stufe weiterkommen
+            if len(winners) != 1 or holders != winners:
+                violations += 1
+                print(f"  Verstoß bei {stage}: {len(winners)} erfolgreich, belegt von {holders}")
+    return violations
+
+
+async def load(client, prefix, names, clients, duration):
+    """Lässt `clients` Clients für `duration` Sekunden zufällige Statuswechsel senden."""
+    statuses = Counter()
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def send(method, path, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] += 1
+        return response
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            action = random.choice(CYCLE + ("stop",))
+            if action != "stop":
+                await send("PATCH", f"{prefix}/{random.choice(names)}/{action}")
+                continue
+            await send("POST", f"{prefix}/stop")
+            # Gestoppte Sequenzen zurücksetzen, damit der Zyklus weiterläuft
+            stopped = [s["name"] for s in (await send("GET", prefix)).json() if s["status"] == "stopped"]
+            if stopped:
+                await send("POST", f"{prefix}/bulk", json={"reset": stopped})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return time.perf_counter() - start, statuses, sorted(latencies)
+
+
+async def check_invariants(client, prefix):
+    """Jede Stufe darf am Ende von höchstens einer Sequenz belegt sein."""
+    held = Counter(s["status"] for s in (await client.get(prefix)).json())
+    return [stage for stage in ("first_stage", "second_stage") if held[stage] > 1] + (
+        ["running"] if held["running"] + held["paused"] > 1 else []
+    )
+
+
+async def stress(url, prefix, clients, duration, sequences, rounds):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        names = await prepare(client, prefix, sequences)
+
+        print(f"Wettlauf: {sequences} Sequenzen, {rounds} Runden...")
+        violations = await race(client, prefix, names, rounds)
+        print(f"  Verstöße gegen 'genau eine Sequenz je Stufe': {violations}")
+
+        names = await prepare(client, prefix, sequences)
+        print(f"Last: {clients} Clients, {duration:.0f} s...")
+        elapsed, statuses, latencies = await load(client, prefix, names, clients, duration)
+        total = sum(statuses.values())
+        print(f"  Anfragen: {total} in {elapsed:.2f} s ({total / elapsed:.1f} Anfragen/s)")
+        if latencies:
+            p50, p99 = (latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 for q in (0.5, 0.99))
+            print(f"  Latenz: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+        print(f"  Status: {', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))}")
+
+        broken = await check_invariants(client, prefix)
+        if broken:
+            print(f"  Mehrfach belegte Stufen nach dem Lasttest: {', '.join(broken)}")
+        return 1 if violations or broken else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.apistress", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--prefix", default="/api/shows/stress/sequences")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--sequences", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(stress(args.url, args.prefix, args.clients, args.duration, args.sequences, args.rounds))
+    except KeyboardInterrupt:
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""Aufzeichnen, Abspielen und Erzeugen von OSC-Verkehr für Lasttests von Controller & Simulator.
+
+Aufzeichnen (OnTime sendet an 9999, der Controller lauscht mit OSC_PORT=9998):
+
+    python -m bench.oscbench record show.oscl --listen 9999 --forward 127.0.0.1:9998
+
+Abspielen gegen laufenden Controller & Simulator (10-fache Geschwindigkeit):
+
+    python -m bench.oscbench replay show.oscl --speed 10
+
+Synthetische Show mit 2000 Cues erzeugen (Manifest für SHOW_MANIFEST und OSC-Log):
+
+    python -m bench.oscbench synth 2000 --log big.oscl --manifest shows/big.json
+"""
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import httpx
+from collections import Counter, defaultdict
+from pythonosc import osc_packet
+from pythonosc.udp_client import SimpleUDPClient
+
+
+LOG_HEADER = {"format": "oscl", "version": 1}
+SAMPLE_RE = re.compile(r"^(\w+)(?:\{(.*)\})? (\S+)$")
+LABEL_RE = re.compile(r'(\w+)="([^"]*)"')
+
+
+# ==========================================
+# Log-Format: erste Zeile Header, danach je Nachricht [Sekunden seit Start, Adresse, Argumente...]
+# ==========================================
+
+def _log_line(offset, address, args):
+    return json.dumps([round(offset, 6), address, *args], separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def write_log(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(LOG_HEADER) + "\n")
+        for offset, address, args in entries:
+            f.write(_log_line(offset, address, args) + "\n")
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != LOG_HEADER["format"]:
+            raise ValueError(f"{path} ist kein OSC-Log.")
+        entries = []
+        for line in f:
+            if line.strip():
+                offset, address, *args = json.loads(line)
+                entries.append((offset, address, args))
+    return entries
+
+
+# ==========================================
+# Aufzeichnen
+# ==========================================
+
+class _Recorder(asyncio.DatagramProtocol):
+    def __init__(self, out, forward):
+        self.out = out
+        self.forward = forward
+        self.start = None
+        self.count = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        if self.forward:
+            self.transport.sendto(data, self.forward)
+        try:
+            packet = osc_packet.OscPacket(data)
+        except osc_packet.ParseError:
+            return
+        for timed_msg in packet.messages:
+            self.out.write(_log_line(now - self.start, timed_msg.message.address, timed_msg.message.params) + "\n")
+            self.count += 1
+        self.out.flush()
+
+
+async def record(path, listen_port, forward):
+    """Zeichnet alle OSC-Nachrichten an `listen_port` auf und leitet sie optional weiter."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(json.dumps(LOG_HEADER) + "\n")
+        recorder = _Recorder(out, forward)
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: recorder, local_addr=("127.0.0.1", listen_port)
+        )
+        print(f"Zeichne OSC auf Port {listen_port} auf (Strg+C beendet)...")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            transport.close()
+            print(f"{recorder.count} Nachrichten in {path} gespeichert.")
+
+
+# ==========================================
+# Synthetische Shows
+# ==========================================
+
+def synthesize(count, cue_seconds=10.0):
+    """Erzeugt Cue-Namen und einen gültigen Ablauf (next_event, first/second_stage, start) je Cue."""
+    names = [f"Cue{i:05d}" for i in range(count)]
+    entries = []
+    for i, name in enumerate(names):
+        t = i * cue_seconds
+        entries.append((t, "/next_event", [name]))
+        entries.append((t + 0.1 * cue_seconds, "/first_stage", []))
+        entries.append((t + 0.2 * cue_seconds, "/second_stage", []))
+        entries.append((t + 0.3 * cue_seconds, "/start", [name]))
+    entries.append((count * cue_seconds, "/stop", []))
+    return names, entries
+
+
+# ==========================================
+# Abspielen & Auswertung
+# ==========================================
+
+def scrape(url):
+    """Liest einen Prometheus-Endpunkt ein: {(Name, Labels): Wert}."""
+    try:
+        text = httpx.get(url, timeout=2).text
+    except httpx.RequestError:
+        return {}
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE_RE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[(name, tuple(LABEL_RE.findall(labels or "")))] = float(value)
+    return samples
+
+
+def _histograms(before, after, name):
+    """Bucket-Differenzen eines Histogramms je Serie (ohne `le`) zwischen zwei Abfragen."""
+    series = defaultdict(list)
+    for (sample, labels), value in after.items():
+        if sample != f"{name}_bucket":
+            continue
+        le = dict(labels)["le"]
+        key = tuple(label for label in labels if label[0] != "le")
+        series[key].append((float(le), value - before.get((sample, labels), 0)))
+    return {key: sorted(buckets) for key, buckets in series.items()}
+
+
+def _bucket_quantile(buckets, q):
+    """Quantil aus kumulativen Buckets mit linearer Interpolation (wie histogram_quantile)."""
+    total = buckets[-1][1] if buckets else 0
+    if total <= 0:
+        return None
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / max(count - lower_count, 1e-9)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+class _OntimeListener(asyncio.DatagramProtocol):
+    """Nimmt die Antworten des Controllers an OnTime entgegen (z. B. /ontime/stop bei Fehlern)."""
+
+    def __init__(self):
+        self.replies = Counter()
+
+    def datagram_received(self, data, addr):
+        try:
+            for timed_msg in osc_packet.OscPacket(data).messages:
+                self.replies[timed_msg.message.address] += 1
+        except osc_packet.ParseError:
+            pass
+
+
+async def replay(entries, target, speed, ontime_port, controller_metrics, simulator_metrics, settle):
+    """Spielt ein OSC-Log deterministisch ab und gibt einen Bericht aus."""
+    listener = _OntimeListener()
+    ontime_transport = None
+    if ontime_port:
+        ontime_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: listener, local_addr=("127.0.0.1", ontime_port)
+        )
+
+    controller_before = scrape(controller_metrics)
+    simulator_before = scrape(simulator_metrics)
+
+    client = SimpleUDPClient(*target)
+    lateness = []
+    start = time.perf_counter()
+    for offset, address, args in entries:
+        due = start + (offset / speed if speed else 0)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lateness.append(time.perf_counter() - due)
+        client.send_message(address, args)
+    sent_seconds = time.perf_counter() - start
+
+    await asyncio.sleep(settle)  # Letzte Befehle abarbeiten lassen
+    controller_after = scrape(controller_metrics)
+    simulator_after = scrape(simulator_metrics)
+    if ontime_transport:
+        ontime_transport.close()
+
+    report(entries, sent_seconds, lateness, listener.replies,
+           controller_before, controller_after, simulator_before, simulator_after)
+
+
+def report(entries, sent_seconds, lateness, replies, controller_before, controller_after,
+           simulator_before, simulator_after):
+    commands = Counter(address for _, address, _ in entries)
+    print(f"\nBefehle gesendet: {len(entries)} in {sent_seconds:.2f} s "
+          f"({len(entries) / max(sent_seconds, 1e-9):.1f} Befehle/s)")
+    if lateness:
+        print(f"Sende-Verspätung: max {max(lateness) * 1000:.2f} ms")
+
+    print("\nLatenz je Befehl (OSC-Empfang bis Handler-Ende, ms):")
+    print(f"  {'Adresse':<16}{'Anzahl':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for key, buckets in sorted(_histograms(controller_before, controller_after, "controller_command_duration_ms").items()):
+        address = dict(key).get("address", "?")
+        values = [_bucket_quantile(buckets, q) for q in (0.5, 0.95, 0.99)]
+        cells = "".join(f"{v:>10.2f}" if v is not None else f"{'-':>10}" for v in values)
+        print(f"  {address:<16}{int(buckets[-1][1]):>8}{cells}")
+
+    print("\nSimulator (Anfragen je Route):")
+    requests = Counter()
+    errors = Counter()
+    for (sample, labels), value in simulator_after.items():
+        if sample != "simulator_request_duration_ms_count":
+            continue
+        delta = value - simulator_before.get((sample, labels), 0)
+        labels = dict(labels)
+        route = f"{labels['method']} {labels['route']}"
+        requests[route] += delta
+        if int(labels["status"]) >= 400:
+            errors[route] += delta
+    for route, count in sorted(requests.items()):
+        if count:
+            print(f"  {route:<45}{int(count):>8}  Fehlerquote {errors[route] / count:.1%}")
+    total = sum(requests.values())
+    if total:
+        print(f"  Zustandsfehler gesamt: {int(sum(errors.values()))} von {int(total)} ({sum(errors.values()) / total:.1%})")
+
+    stops = replies.get("/ontime/stop", 0)
+    print(f"\nFehlermeldungen an OnTime (/ontime/stop): {stops} "
+          f"({stops / max(sum(commands.values()), 1):.1%} der Befehle)")
+
+
+# ==========================================
+# Kommandozeile
+# ==========================================
+
+def _host_port(value):
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.oscbench", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="OSC-Verkehr aufzeichnen")
+    rec.add_argument("log")
+    rec.add_argument("--listen", type=int, default=9999)
+    rec.add_argument("--forward", type=_host_port, default=None, help="Weiterleiten an host:port")
+
+    rep = commands.add_parser("replay", help="OSC-Log abspielen und auswerten")
+    rep.add_argument("log")
+    rep.add_argument("--target", type=_host_port, default=("127.0.0.1", 9999))
+    rep.add_argument("--speed", type=float, default=1.0, help="Zeitraffer-Faktor (0 = ohne Pausen)")
+    rep.add_argument("--ontime-port", type=int, default=8888, help="Antworten des Controllers (0 = aus)")
+    rep.add_argument("--controller-metrics", default="http://127.0.0.1:9100/metrics")
+    rep.add_argument("--simulator-metrics", default="http://127.0.0.1:8000/metrics")
+    rep.add_argument("--settle", type=float, default=2.0, help="Wartezeit nach dem letzten Befehl (s)")
+
+    syn = commands.add_parser("synth", help="Synthetische Show erzeugen")
+    syn.add_argument("count", type=int)
+    syn.add_argument("--log", required=True)
+    syn.add_argument("--manifest", required=True)
+    syn.add_argument("--cue-seconds", type=float, default=10.0)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "record":
+            asyncio.run(record(args.log, args.listen, args.forward))
+        elif args.command == "replay":
+            asyncio.run(replay(read_log(args.log), args.target, args.speed, args.ontime_port,
+                               args.controller_metrics, args.simulator_metrics, args.settle))
+        else:
+            names, entries = synthesize(args.count, args.cue_seconds)
+            write_log(args.log, entries)
+            with open(args.manifest, "w", encoding="utf-8") as f:
+                json.dump({"name": f"Synthetische Show ({args.count} Cues)",
+                           "cues": [{"name": name} for name in names]}, f, indent=4)
+            print(f"{len(entries)} Befehle in {args.log}, {len(names)} Cues in {args.manifest}.")
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
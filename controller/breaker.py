@@ -0,0 +1,73 @@
+import time
+import httpx
+import logging
+from .metrics import registry
+
+
+logger = logging.getLogger("controller")
+
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = registry.gauge(
+    "controller_circuit_state", "Zustand des Circuit Breakers zur Feuerwerks-API (0 = closed, 1 = half_open, 2 = open)."
+)
+
+
+class CircuitOpenError(httpx.RequestError):
+    """Anfrage abgewiesen, weil der Circuit Breaker zur Feuerwerks-API offen ist."""
+
+
+class CircuitBreaker:
+    """Circuit Breaker für alle Anfragen an die Feuerwerks-API.
+
+    Nach `failure_threshold` Fehlern in Folge (Netzwerkfehler oder HTTP 5xx) öffnet
+    der Breaker: Anfragen scheitern sofort mit `CircuitOpenError`. Nach
+    `reset_timeout` Sekunden wechselt er auf half_open und lässt nur Probe-Anfragen
+    (Heartbeat) durch; ist eine erfolgreich, schließt er wieder. `on_open` und `on_close`
+    werden beim Öffnen bzw. beim Schließen nach einem Ausfall aufgerufen.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=2.0, on_open=None, on_close=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_open = on_open
+        self.on_close = on_close
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = CLOSED
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED])
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_STATE.set(STATE_VALUES[state])
+
+    def allow(self, probe=False):
+        """True, wenn eine (Probe-)Anfrage gesendet werden darf."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return probe and self.state == HALF_OPEN
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+            logger.info("Feuerwerks-API wieder erreichbar – Circuit Breaker geschlossen.")
+            if self.on_close is not None:
+                self.on_close()
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state == HALF_OPEN:
+                # Probe fehlgeschlagen: Ausfall besteht weiter, OnTime wurde bereits benachrichtigt
+                self._set_state(OPEN)
+            elif self.state == CLOSED:
+                self._set_state(OPEN)
+                logger.error("Feuerwerks-API gestört – Circuit Breaker geöffnet.")
+                if self.on_open is not None:
+                    self.on_open()
@@ -0,0 +1,63 @@
+import queue
+import atexit
+import logging
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+EVENT_BUFFER_SIZE = 10000  # Letzte Log-Ereignisse für die Auswertung nach der Show
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Reicht Log-Records unformatiert an den Listener-Thread weiter.
+
+    Der Standard-`QueueHandler` formatiert die Nachricht schon im aufrufenden Thread;
+    hier geschieht das erst im Listener, damit kein Cue auf `%`-Formatierung wartet.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class EventBuffer(logging.Handler):
+    """Ringpuffer der zuletzt protokollierten Ereignisse (abrufbar unter `/events`)."""
+
+    def __init__(self, capacity=EVENT_BUFFER_SIZE):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+
+    def dump(self):
+        self.acquire()
+        try:
+            lines = list(self.records)
+        finally:
+            self.release()
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def configure_logging(level=logging.INFO, capacity=EVENT_BUFFER_SIZE):
+    """Leitet alle Log-Ausgaben über eine Queue an einen eigenen Thread.
+
+    Formatierung, Ausgabe auf die Konsole und der Ereignis-Ringpuffer laufen im Listener;
+    im Event-Loop bleibt pro Aufruf nur das Einreihen des Records. Gibt den Ringpuffer zurück.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    events = EventBuffer(capacity)
+    events.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console, events, respect_handler_level=True)
+    root = logging.getLogger()
+    root.handlers[:] = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(level)
+    # httpx protokolliert jede Anfrage selbst ("HTTP Request: ..."); das übernimmt bereits der Transport
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    listener.start()
+    atexit.register(listener.stop)  # Noch wartende Records beim Beenden ausgeben
+    return events
@@ -1,104 +1,296 @@
 import os                                                          
 import vlc
+import time
 import httpx
+import signal
+import asyncio
 import logging
-import threading
-from pythonosc.dispatcher import Dispatcher
-from pythonosc.osc_server import BlockingOSCUDPServer
-from pythonosc.udp_client import SimpleUDPClient
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+from .logs import configure_logging
+from .oscout import OscOutput
+from .transport import FireworksTransport
+from .breaker import CircuitBreaker
+from .show import load_manifest, plan_reconciliation
+from .media import MediaCache
+from .mirror import StatusMirror
+from .sync import LatencyEstimator, TimedDispatcher, cue_deadline, sleep_until, wait_until_playing
+from .metrics import CUE_SKEW, STOP_LATENCY, elapsed_since_receipt_ms, start_metrics_server, track
+from .scheduler import PRIORITY_CUE, PRIORITY_PAUSE, PRIORITY_STAGE, PRIORITY_STOP, CommandScheduler
 
 
 ### Logger konfigurieren
-# Logger Controller
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+# Logger Controller: Ausgabe über eine Queue in einem eigenen Thread, letzte Ereignisse unter `/events`
+events = configure_logging(logging.INFO)
 logger = logging.getLogger("controller")
 
 
 # Dynamische Pfadkonfiguration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 AUDIO_DIR = os.path.join(BASE_DIR, "../audio")
+AUDIO_LATENCY_MS = float(os.environ.get("AUDIO_LATENCY_MS", "20"))
+MEDIA_CACHE_MB = int(os.environ.get("MEDIA_CACHE_MB", "256"))
+SHOW_MANIFEST = os.environ.get("SHOW_MANIFEST", os.path.join(BASE_DIR, "../shows/default.json"))
 
-# API-URL des Simulators
+# API-URL des Simulators; mit FIREWORKS_SHOW steuert der Controller eine eigene Show
 SIMULATOR_URL = "http://127.0.0.1:8000"
+FIREWORKS_SHOW = os.environ.get("FIREWORKS_SHOW")
+API_PREFIX = f"/api/shows/{FIREWORKS_SHOW}/sequences" if FIREWORKS_SHOW else "/api/sequences"
+
+# Port, auf dem der Controller OSC-Befehle von OnTime empfängt
+OSC_PORT = int(os.environ.get("OSC_PORT", "9999"))
+
+# Port, auf dem OnTime OSC-Nachrichten des Controllers empfängt
+ONTIME_OSC_PORT = int(os.environ.get("ONTIME_OSC_PORT", "8888"))
+
+# Port für den Prometheus-Endpunkt `/metrics` des Controllers
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+
+# `/ready` des Metrik-Servers meldet 200, solange ein Cue ausgelöst werden kann
+ready = asyncio.Event()
+
+# Gemeinsamer HTTP-Client (Keep-Alive) für alle Anfragen an die Feuerwerkssteuerung;
+# bei gestörter API scheitern Anfragen sofort, OnTime wird einmalig benachrichtigt
+# und der Controller meldet sich bis zur Erholung der API nicht bereit
+fireworks = FireworksTransport(SIMULATOR_URL, breaker=CircuitBreaker(
+    on_open=lambda: fireworks_unreachable(),
+    on_close=lambda: fireworks_reachable(),
+))
+HEARTBEAT_INTERVAL = float(os.environ.get("HEARTBEAT_INTERVAL", "1.0"))  # Sekunden zwischen zwei Heartbeats
+
+# Dauerhafter OSC-Kanal an OnTime (Versand im Hintergrund)
+ontime = OscOutput("127.0.0.1", ONTIME_OSC_PORT)
+
+# Lokale Kopie der Sequenz-Status (über den Änderungs-Feed des Simulators aktuell gehalten)
+mirror = StatusMirror(API_PREFIX)
+
+# Cue-Namen aus dem Show-Manifest
+show_cues = load_manifest(SHOW_MANIFEST)
 
 # Globale Variablen zur Zustandsverwaltung
 current_media = None
 paused_time = {}
 next_event = None
 
+# Gemessene Latenzen je Verbindung für synchrones Auslösen von Audio & Feuerwerk
+fireworks_latency = LatencyEstimator(0.005)  # Round-Trip einer HTTP-Anfrage
+audio_latency = LatencyEstimator(AUDIO_LATENCY_MS / 1000)  # play() bis VLC abspielt
+
+# Prioritäts-Scheduler für OSC-Befehle
+scheduler = CommandScheduler()
+
 # VLC-Instanz erstellen
 vlc_instance = vlc.Instance("--quiet", "--verbose=0")
-player = vlc_instance.media_player_new()
+player = vlc_instance.media_player_new()  # aktuell aktiver Player
+
+# Vorgeladene Audiodateien der nächsten Cues
+media_cache = MediaCache(vlc_instance, AUDIO_DIR, max_bytes=MEDIA_CACHE_MB * 1024 * 1024)
 
 
 # OSC-Nachricht an OnTime senden
 def send_osc_message(address, message):
-    """Sendet eine OSC-Nachricht an OnTime."""
-    client = SimpleUDPClient("127.0.0.1", 8888)  # Port auf dem OnTime lauscht
-    client.send_message(address, message)
-    logger.info(f"OSC-Nachricht an OnTime gesendet: {address} -> {message}")
+    """Reiht eine OSC-Nachricht an OnTime ein; der Versand blockiert den Aufrufer nicht."""
+    ontime.send(address, message)
+
+
+# Erreichbarkeit der Feuerwerks-API (Callbacks des Circuit Breakers)
+def fireworks_unreachable():
+    ready.clear()
+    send_osc_message("/ontime/stop", "Feuerwerkssystem nicht erreichbar!")
+
+
+def fireworks_reachable():
+    # Bereit erst wieder, wenn alle Cues des Manifests im Simulator liegen (sonst gleicht der Heartbeat ab)
+    if cues_present():
+        ready.set()
+
+
+def cues_present():
+    return mirror.synced and all(mirror.status(name) is not None for name in show_cues)
 
 
 # API-Request senden mit httpx
-def send_fireworks_request(endpoint, method="PATCH", sequence_name=None):
+async def send_fireworks_request(endpoint, method="PATCH", sequence_name=None):
     """Sendet eine Anfrage an die Feuerwerkssteuerung."""
-    url = f"{SIMULATOR_URL}/{sequence_name}/{endpoint}" if sequence_name else f"{SIMULATOR_URL}/{endpoint}"
+    url = f"{API_PREFIX}/{sequence_name}/{endpoint}" if sequence_name else f"{API_PREFIX}/{endpoint}"
     try:
-        response = httpx.request(method, url, timeout=5)
-        
-        # HTTP-Responses nur in die Log-Datei, NICHT in die Konsole
-        logger.info(f"{method} {url} - Status: {response.status_code} - Antwort: {response.text}")
+        response = await fireworks.request(method, url, endpoint=endpoint)
+
+        # Status und Dauer protokolliert der Transport; den Body nur im Debug-Level
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s - Antwort: %s", method, url, response.text)
 
         # Falls ein HTTP-Fehler auftritt, zusätzlich als ERROR ins Terminal
         if response.status_code >= 400:
-            logger.error(f"Fehler bei Feuerwerkssteuerung: {response.status_code}, {response.text}")
+            logger.error("Fehler bei Feuerwerkssteuerung: %s, %s", response.status_code, response.text)
             send_osc_message("/ontime/stop", f"Fehler: HTTP {response.status_code} für {sequence_name}")
             return None  # Fehler, Rückgabe ist None
 
+        if sequence_name and response.content:
+            mirror.apply_sequences([response.json()])
         return response
     except httpx.RequestError as e:
-        logger.error(f"Feuerwerks-API nicht erreichbar: {e}")
+        logger.error("Feuerwerks-API nicht erreichbar: %s", e)
         send_osc_message("/ontime/stop", "Feuerwerkssystem nicht erreichbar!")
         return None
 
 
+# Mehrere Statuswechsel atomar ausführen
+async def send_transition_request(steps, event_title):
+    """Sendet eine Transaktion an die Feuerwerkssteuerung; bei Fehlern wird OnTime gestoppt."""
+    url = f"{API_PREFIX}/transitions"
+    try:
+        response = await fireworks.post(url, endpoint="transitions", json=steps)
+    except httpx.RequestError as e:
+        logger.error("Feuerwerks-API nicht erreichbar: %s", e)
+        send_osc_message("/ontime/stop", "Feuerwerkssystem nicht erreichbar!")
+        return None
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("POST %s - Antwort: %s", url, response.text)
+    if response.status_code == 412:
+        logger.warning("Event %s kann nicht gestartet werden, da `second_stage` fehlt.", event_title)
+        send_osc_message("/ontime/stop", f"Fehler: {event_title} ist nicht `second_stage`.")
+        return None
+    if response.status_code >= 400:
+        logger.error("Fehler bei Feuerwerkssteuerung: %s, %s", response.status_code, response.text)
+        send_osc_message("/ontime/stop", f"Fehler: HTTP {response.status_code} für {event_title}")
+        return None
+    mirror.apply_sequences(response.json()["sequences"])
+    return response
+
+
 # Sequenzen initialisieren
-def initialize_sequences():
-    """Setzt alle Sequenzen neu auf."""
-    logger.info("Setze Sequenzen zurück & initialisiere sie...")
-    httpx.delete(f"{SIMULATOR_URL}/")  # Alle Sequenzen zurücksetzen
+async def initialize_sequences(retry=True):
+    """Gleicht die Sequenzen des Simulators mit dem Show-Manifest ab (nur die Differenz)."""
+    logger.info("Gleiche Sequenzen mit dem Show-Manifest ab...")
+    try:
+        if not mirror.synced:
+            await mirror.verify(fireworks)  # Ohne Feed: bedingte Abfrage der Liste
+        delta = plan_reconciliation(show_cues, mirror.sequences())
+        if not any(delta.values()):
+            logger.info("Sequenzen entsprechen bereits dem Manifest.")
+            return
+        response = await fireworks.post(f"{API_PREFIX}/bulk", endpoint="reset", json=delta)
+    except httpx.HTTPStatusError as e:
+        logger.error("Konnte die Sequenzen nicht abrufen: %s", e.response.status_code)
+        return
+    except httpx.RequestError as e:
+        logger.error("Sequenzen nicht abgeglichen, Feuerwerks-API nicht erreichbar: %s", e)
+        return
 
-    for name in ["Audio1", "Audio2", "Audio3", "Audio4"]:
-        response = httpx.post(f"{SIMULATOR_URL}/?name={name}")
-        if response.status_code == 200:
-            logger.info(f"Sequenz '{name}' erfolgreich erstellt.")
-        else:
-            logger.error(f"Fehler beim Erstellen von '{name}': {response.json()}")
+    if response.status_code == 200:
+        result = response.json()
+        mirror.apply_sequences(result["sequences"], result["deleted"])
+        logger.info(
+            "Sequenzen abgeglichen: %s angelegt, %s gelöscht, %s zurückgesetzt.",
+            len(delta["create"]), len(delta["delete"]), len(delta["reset"]),
+        )
+    elif retry and response.status_code in (403, 404):
+        # Mirror wich vom Simulator ab: neu laden und einmal wiederholen
+        logger.warning("Status-Mirror veraltet – gleiche ab und wiederhole den Abgleich.")
+        mirror.synced = False
+        await initialize_sequences(retry=False)
+    else:
+        logger.error("Fehler beim Abgleich der Sequenzen: %s, %s", response.status_code, response.text)
 
 
 # Audio- & Feuerwerkssteuerung
+def prepare_audio(event_title):
+    """Lädt die Audiodatei eines kommenden Cues vorab in den Media-Cache."""
+    if event_title != "countdown":
+        media_cache.warm(event_title)
+
+
 def play_audio(event_title):
-    """Spielt eine Audiodatei ab & startet die Feuerwerkssequenz."""
-    global current_media, paused_time
+    """Spielt die vorgeladene Audiodatei des Events ab und gibt den Player zurück."""
+    global current_media, paused_time, player
 
     if event_title == "countdown":
         logger.info("Countdown gestartet (keine Musik, nur Sequenzwechsel).")
-        return
+        return None
 
-    audio_path = os.path.abspath(os.path.join(AUDIO_DIR, f"{event_title}.mp3"))
-    if not os.path.exists(audio_path):
-        logger.error(f"Datei nicht gefunden: {audio_path}")
-        return
+    cued_player = media_cache.take(event_title)
+    if cued_player is None:
+        # Ohne eigenes Audio darf die Musik des vorherigen Cues nicht weiterlaufen
+        if current_media is not None:
+            with track("vlc_stop"):
+                player.stop()
+            current_media = None
+        return None
 
-    media = vlc_instance.media_new(audio_path)
-    media.add_option(":no-video")
-    player.set_media(media)
+    if cued_player is not player:
+        with track("vlc_stop"):
+            player.stop()  # Vorheriges Audio beenden
+        player = cued_player
 
+    with track("vlc_play"):
+        player.play()
     current_media = event_title
+    return player
+
+
+def restore_audio(event_title, previous, position, left_at):
+    """Nimmt das Audio des weiterlaufenden Cues nach einem gescheiterten Cue-Wechsel wieder auf."""
+    global current_media, player
+
+    player = previous
+    current_media = event_title
+    if event_title in paused_time:
+        return  # Pausierter Cue: `/start` setzt ihn wie gewohnt fort
+    resume_time = position + int((time.perf_counter() - left_at) * 1000)
+    with track("vlc_play"):
+        player.play()
+    with track("vlc_set_time"):
+        player.set_time(resume_time)
+    logger.info("Audio %s bei %s ms wieder aufgenommen.", event_title, resume_time)
+
+
+async def fire_synchronized(deadline, send_pyro, start_audio):
+    """Löst Feuerwerk (HTTP) und Audio so aus, dass beide zur `deadline` beginnen.
+
+    Die HTTP-Anfrage wird um die halbe gemessene Round-Trip-Zeit vorgezogen, `play()`
+    um die gemessene Anlaufzeit von VLC. Der erreichte Versatz wird als Metrik
+    `cue_skew` (Audio minus Feuerwerk, ms) protokolliert.
+    """
+    async def pyro():
+        await sleep_until(deadline - fireworks_latency.value / 2)
+        sent = time.perf_counter()
+        response = await send_pyro()
+        rtt = time.perf_counter() - sent
+        fireworks_latency.update(rtt)
+        return response, sent + rtt / 2
+
+    async def audio():
+        await sleep_until(deadline - audio_latency.value)
+        called = time.perf_counter()
+        started = start_audio()
+        if started is None:
+            return None
+        playing_at = await wait_until_playing(started)
+        if playing_at is None:
+            logger.warning("VLC hat die Wiedergabe nicht rechtzeitig gestartet.")
+            return None
+        audio_latency.update(playing_at - called)
+        return playing_at
+
+    (response, pyro_at), audio_at = await asyncio.gather(pyro(), audio())
+    if response is not None and audio_at is not None:
+        skew_ms = (audio_at - pyro_at) * 1000
+        CUE_SKEW.observe(skew_ms)
+        logger.info("Versatz Audio/Feuerwerk: %.1f ms", skew_ms)
+    return response
+
+
+def cue_start_deadline():
+    """Deadline aus dem OSC-Timetag oder – ohne Timetag – der frühestmögliche gemeinsame Zeitpunkt."""
+    deadline = cue_deadline.get()
+    if deadline is None:
+        deadline = time.perf_counter() + max(fireworks_latency.value / 2, audio_latency.value)
+    return deadline
 
 
 # OSC-Event-Handler
-def handle_start_event(address, *args):
+async def handle_start_event(address, *args):
     """Startet das Event. Falls vorheriges Event läuft, wird es gestoppt."""
     global paused_time, current_media
     event_title = str(args[0])
@@ -109,134 +301,266 @@ def handle_start_event(address, *args):
 
     # Falls Event pausiert war, fortsetzen
     if current_media == event_title and current_media in paused_time:
-        send_fireworks_request("resume", "PATCH", event_title)
         resume_time = paused_time.pop(current_media)
-        player.play()
-        player.set_time(resume_time)
-        logger.info(f"Audio {current_media} wird bei {resume_time} ms fortgesetzt.")
+
+        def resume_audio():
+            with track("vlc_play"):
+                player.play()
+            with track("vlc_set_time"):
+                player.set_time(resume_time)
+            return player
+
+        response = await fire_synchronized(
+            cue_start_deadline(),
+            lambda: send_fireworks_request("resume", "PATCH", event_title),
+            resume_audio,
+        )
+        if response is None:
+            # Feuerwerk bleibt pausiert: Audio wieder anhalten, damit ein späteres /start fortsetzen kann
+            with track("vlc_pause"):
+                player.set_pause(1)
+                player.set_time(resume_time)
+            paused_time[event_title] = resume_time
+            logger.info("Audio %s wieder pausiert, da die Feuerwerkssequenz nicht fortgesetzt wurde.", event_title)
+            return
+        logger.info("Audio %s wird bei %s ms fortgesetzt.", current_media, resume_time)
         return
 
-    # Falls ein anderes Event läuft, zuerst stoppen
-    if current_media and current_media != event_title:
-        logger.info(f"Stoppe Event '{current_media}' bevor '{event_title}' gestartet wird.")
-        url = f"{SIMULATOR_URL}/stop"
-        httpx.post(url)  # Feuerwerkssequenz stoppen
-        response = httpx.get(f"{SIMULATOR_URL}/{current_media}")
-        if response.status_code == 200:
-            logger.info(f"Feuerwerkssequenz {current_media} gestopt.")
-        logger.info(f"Audio {current_media} gestoppt.")
-        current_media = None
-        
-
-    # Prüfen, ob `second_stage` aktiv ist
-    response = httpx.get(f"{SIMULATOR_URL}/{event_title}")
-    if response.status_code == 200:
-        status = response.json().get("status", "")
-        if status in ["second_stage", "paused"]:
-            send_fireworks_request("running", "PATCH", event_title)
-            logger.info(f"Feuerwerkssequenz {event_title} läuft jetzt.")
-            play_audio(event_title)
-            player.play()
-            logger.info(f"Audio {event_title} gestartet.")  # Audio-Datei abspielen
-        else:
-            logger.warning(f"Event {event_title} kann nicht gestartet werden, da `second_stage` fehlt.")
-            send_osc_message("/ontime/stop", f"Fehler: {event_title} ist nicht `second_stage`.")
+    # Feuerwerks-API gestört: Cue sofort abweisen, bevor Audio anläuft
+    if not fireworks.breaker.allow():
+        logger.error("Event %s nicht gestartet, Circuit Breaker zur Feuerwerks-API ist offen.", event_title)
+        send_osc_message("/ontime/stop", "Feuerwerkssystem nicht erreichbar!")
+        return
+
+    # Status aus dem lokalen Mirror prüfen – ohne Netzwerk-Anfrage
+    if mirror.synced and mirror.status(event_title) not in ("second_stage", "paused"):
+        logger.warning("Event %s kann nicht gestartet werden, da `second_stage` fehlt.", event_title)
+        send_osc_message("/ontime/stop", f"Fehler: {event_title} ist nicht `second_stage`.")
+        return
+
+    # Laufendes Event stoppen und neues Event starten – in einer atomaren Transaktion.
+    # Maßgeblich ist der Status des Feuerwerks, nicht das Audio: auch ein Cue ohne
+    # (angelaufenes) Audio hält `running`. Ohne synchronen Mirror wird immer gestoppt,
+    # außer der Cue selbst ist das aktuelle Event (Fortsetzen aus `paused`).
+    holder = mirror.holder("running", "paused") if mirror.synced else current_media
+    steps = []
+    if holder != event_title:
+        if holder is not None:
+            logger.info("Stoppe Event '%s' bevor '%s' gestartet wird.", holder, event_title)
+        steps.append({"action": "stop"})
+    # Start nur, wenn das Event in `second_stage` (oder pausiert) ist
+    steps.append({"action": "start", "name": event_title, "expect": ["second_stage", "paused"]})
+
+    # Feuerwerk und Audio gemeinsam zur Deadline auslösen
+    outgoing, outgoing_player = current_media, player
+    left_at = None  # Position (ms) und Zeitpunkt, an dem das vorherige Audio verlassen wurde
+
+    def start_audio():
+        nonlocal left_at
+        if outgoing is not None:
+            left_at = (outgoing_player.get_time(), time.perf_counter())
+        return play_audio(event_title)
+
+    response = await fire_synchronized(
+        cue_start_deadline(),
+        lambda: send_transition_request(steps, event_title),
+        start_audio,
+    )
+    if response is None:
+        # Feuerwerk nicht gestartet: bereits angelaufenes Audio sofort wieder stoppen
+        if current_media == event_title:
+            player.stop()
+            current_media = None
+            logger.info("Audio %s gestoppt, da die Feuerwerkssequenz nicht gestartet wurde.", event_title)
+        # Die Transaktion ist atomar – der vorherige Cue läuft weiter, also auch sein Audio
+        if outgoing is not None and outgoing != event_title and left_at is not None:
+            restore_audio(outgoing, outgoing_player, *left_at)
+        return
+
+    if holder is not None and holder != event_title:
+        logger.info("Feuerwerkssequenz %s gestoppt.", holder)
+    if outgoing is not None and outgoing != event_title:
+        logger.info("Audio %s gestoppt.", outgoing)
+    logger.info("Feuerwerkssequenz %s läuft jetzt.", event_title)
+    if current_media == event_title:
+        logger.info("Audio %s gestartet.", event_title)
     else:
-        logger.error(f"Konnte den Status von {event_title} nicht abrufen.")
-        send_osc_message("/ontime/stop", f"Fehler beim Abruf von {event_title}.")
+        logger.warning("Kein Audio für %s gestartet – Feuerwerk läuft ohne Musik.", event_title)
 
 
-def handle_stop_event(address, *args):
+async def handle_stop_event(address, *args):
     """OSC-Handler für Stop-Events."""
     global current_media
 
     logger.info("Event gestoppt.")
 
-    if current_media:
-        url = f"{SIMULATOR_URL}/stop"
-        httpx.post(url) # Feuerwerkssequenz stoppen
-        player.stop()
-        logger.info(f"Audio {current_media} gestoppt.")
-        current_media = None
-
-    httpx.delete(f"{SIMULATOR_URL}/")
-    initialize_sequences()
-
-
-def handle_pause_event(address, *args):
+    # Feuerwerk nach seinem eigenen Status stoppen – auch Cues ohne Audio halten `running`
+    if current_media or not mirror.synced or mirror.holder("running", "paused") is not None:
+        try:
+            response = await fireworks.post(f"{API_PREFIX}/stop", endpoint="stop") # Feuerwerkssequenz stoppen
+            if response.status_code >= 400:
+                logger.error("Feuerwerkssequenz nicht gestoppt: %s, %s", response.status_code, response.text)
+                send_osc_message("/ontime/stop", f"Feuerwerk nicht gestoppt – HTTP {response.status_code}!")
+                mirror.synced = False  # Tatsächlichen Status beim folgenden Abgleich neu laden
+            else:
+                STOP_LATENCY.observe(elapsed_since_receipt_ms())
+                mirror.apply_stop()
+        except httpx.RequestError as e:
+            logger.error("Feuerwerkssequenz konnte nicht gestoppt werden: %s", e)
+            send_osc_message("/ontime/stop", "Feuerwerk nicht gestoppt – Feuerwerkssystem nicht erreichbar!")
+        finally:
+            # Audio stoppt auch dann, wenn die Feuerwerks-API nicht antwortet
+            if current_media:
+                with track("vlc_stop"):
+                    player.stop()
+                logger.info("Audio %s gestoppt.", current_media)
+                current_media = None
+
+    await initialize_sequences()
+
+
+async def handle_pause_event(address, *args):
     """OSC-Handler für Pause-Events."""
     global paused_time, current_media
     logger.info("Event pausiert.")
 
     if current_media:
         paused_time[current_media] = player.get_time()
-        player.pause()
-        logger.info(f"Audio {current_media} pausiert.")
-
-    send_fireworks_request("pause", "PATCH", current_media)
+        with track("vlc_pause"):
+            player.pause()
+        logger.info("Audio %s pausiert.", current_media)
+
+    # Pausiert wird die laufende Feuerwerkssequenz – auch ein Cue ohne Audio hält `running`
+    target = mirror.holder("running") if mirror.synced else current_media
+    if target is None:
+        logger.info("Keine laufende Feuerwerkssequenz zum Pausieren.")
+        return
+    await send_fireworks_request("pause", "PATCH", target)
 
 
-def handle_next_event(address, *args):
+async def handle_next_event(address, *args):
     """Setzt das nächste Event für `first_stage` oder `second_stage`."""
     global next_event
     next_event = str(args[0])
-    logger.info(f"Nächstes Event gesetzt: {next_event}")
+    logger.info("Nächstes Event gesetzt: %s", next_event)
 
 
-def handle_first_stage_event(address, *args):
+async def handle_first_stage_event(address, *args):
     """Setzt das nächste Event in die First Stage."""
     global next_event
     if next_event:
-        logger.info(f"Setze '{next_event}' auf first_stage.")
-        send_fireworks_request("first_stage", "PATCH", next_event)
+        logger.info("Setze '%s' auf first_stage.", next_event)
+        prepare_audio(next_event)
+        await send_fireworks_request("first_stage", "PATCH", next_event)
     else:
         logger.warning("Kein `next_event` gesetzt – `/first_stage` wurde ignoriert.")
 
 
-def handle_second_stage_event(address, *args):
+async def handle_second_stage_event(address, *args):
     """Setzt das nächste Event in die Second Stage."""
     global next_event
     if next_event:
-        logger.info(f"Setze '{next_event}' auf second_stage.")
-        send_fireworks_request("second_stage", "PATCH", next_event)
+        logger.info("Setze '%s' auf second_stage.", next_event)
+        prepare_audio(next_event)
+        await send_fireworks_request("second_stage", "PATCH", next_event)
     else:
         logger.warning("Kein `next_event` gesetzt – `/second_stage` wurde ignoriert.")
 
-def handle_length_event(address, *args):
+async def handle_length_event(address, *args):
     """Setzt die Länge der Sequenz."""
     length = int(args[0])
     length = length/1000
-    logger.info(f"Setze Länge der Sequenz auf {length} Sekunden.")
+    logger.info("Setze Länge der Sequenz auf %s Sekunden.", length)
 
-def ui_startup():
-    """Startet die UI."""
-    os.system("python app.py")
-    logger.info("UI gestartet.")
-        
 # OSC-Server starten
-def start_osc_server():
-    dispatcher = Dispatcher()
-    dispatcher.map("/stop", handle_stop_event)
-    dispatcher.map("/start", handle_start_event)
-    dispatcher.map("/pause", handle_pause_event)
-    dispatcher.map("/next_event", handle_next_event)
-    dispatcher.map("/first_stage", handle_first_stage_event)
-    dispatcher.map("/second_stage", handle_second_stage_event)
-    server = BlockingOSCUDPServer(("127.0.0.1", 9999), dispatcher)
+async def start_osc_server():
+    """Startet den OSC-Server auf der laufenden Event-Loop und gibt den UDP-Transport zurück."""
+    dispatcher = TimedDispatcher()
+    scheduler.map(dispatcher, "/stop", handle_stop_event, PRIORITY_STOP)
+    scheduler.map(dispatcher, "/start", handle_start_event, PRIORITY_CUE)
+    scheduler.map(dispatcher, "/pause", handle_pause_event, PRIORITY_PAUSE)
+    scheduler.map(dispatcher, "/next_event", handle_next_event, PRIORITY_STAGE)
+    scheduler.map(dispatcher, "/first_stage", handle_first_stage_event, PRIORITY_STAGE)
+    scheduler.map(dispatcher, "/second_stage", handle_second_stage_event, PRIORITY_STAGE)
+    server = AsyncIOOSCUDPServer(("127.0.0.1", OSC_PORT), dispatcher, asyncio.get_running_loop())
+    transport, _ = await server.create_serve_endpoint()
     logger.info("OSC-Server läuft...")
-    server.serve_forever()
+    return transport
+
+
+async def heartbeat(interval):
+    """Prüft die Feuerwerks-API regelmäßig per bedingter Abfrage der Sequenzliste.
+
+    Der Heartbeat erkennt Ausfälle, bevor ein Cue daran scheitert, dient bei offenem
+    Circuit Breaker als Probe-Anfrage und repariert nebenbei Abweichungen des Status-Mirrors.
+    Fehlen danach Cues des Manifests (z. B. nach einem Neustart des Simulators ohne
+    dauerhaften Speicher), meldet sich der Controller bis zum erneuten Abgleich nicht bereit.
+    """
+    while True:
+        if fireworks.breaker.allow(probe=True):
+            try:
+                await mirror.verify(fireworks, endpoint="heartbeat", probe=True)
+            except httpx.HTTPError as e:
+                logger.warning("Heartbeat der Feuerwerks-API fehlgeschlagen: %r", e)
+            else:
+                missing = [name for name in show_cues if mirror.status(name) is None]
+                if missing:
+                    logger.warning("Sequenzen fehlen im Simulator (%s) – gleiche erneut ab.", ", ".join(missing))
+                    ready.clear()
+                    await initialize_sequences()
+                if cues_present():
+                    ready.set()
+        await asyncio.sleep(interval)
+
+
+async def connect_fireworks(started):
+    """Wartet auf die Feuerwerks-API, gleicht die Sequenzen ab und meldet den Controller bereit.
+
+    Danach laufen Änderungs-Feed und Heartbeat, bis der Task abgebrochen wird.
+    """
+    logger.info("Warte auf die Feuerwerks-API...")
+    await fireworks.wait_ready(API_PREFIX)
+    await initialize_sequences()
+    ready.set()
+    logger.info("Bereit für den ersten Cue nach %.2f s.", time.perf_counter() - started)
+    await asyncio.gather(mirror.follow(fireworks), heartbeat(HEARTBEAT_INTERVAL))
+
+
+async def main():
+    """Startet OSC-Server und Metriken, verbindet die Feuerwerks-API und wartet auf ein Beenden-Signal."""
+    started = time.perf_counter()
+    shutdown = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown.set)
+        except NotImplementedError:
+            pass  # Windows: Strg+C kommt als KeyboardInterrupt an
+
+    metrics_server = await start_metrics_server("127.0.0.1", METRICS_PORT, ready, events)
+    await ontime.start()
+    osc_transport = await start_osc_server()
+    background = [asyncio.create_task(connect_fireworks(started))]
+    try:
+        await shutdown.wait()
+    finally:
+        logger.info("Beende Controller...")
+        osc_transport.close()
+        metrics_server.close()
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await scheduler.shutdown()
+        player.stop()
+        media_cache.clear()
+        await fireworks.close()
+        await ontime.close()
 
 
 if __name__ == "__main__":
     logger.info("Initialisiere Sequenzen und starte OSC-Server...")
-    ui_startup()
-    initialize_sequences()
-    osc_thread = threading.Thread(target=start_osc_server, daemon=True)
-    osc_thread.start()
-
-
     try:
-        while True:
-            pass
+        asyncio.run(main())
     except KeyboardInterrupt:
-        logger.info("Programm beendet.")
\ No newline at end of file
+        pass
+    logger.info("Programm beendet.")
@@ -0,0 +1,113 @@
+import os
+import vlc
+import logging
+from collections import OrderedDict
+
+
+logger = logging.getLogger("controller")
+
+
+class CachedMedia:
+    """Vorbereitete Audiodatei: geparstes VLC-Media und ein eigener, vorgeladener Player."""
+
+    __slots__ = ("path", "media", "player", "size")
+
+    def __init__(self, path, media, player, size):
+        self.path = path
+        self.media = media
+        self.player = player
+        self.size = size
+
+    def release(self):
+        self.player.stop()
+        self.player.release()
+        self.media.release()
+
+
+class MediaCache:
+    """LRU-Cache für vorgeladene Audiodateien der nächsten Cues.
+
+    `warm` legt das Media an, parst es und startet einen eigenen Player pausiert
+    bei 0 (`:start-paused`), sodass beim Cue-Start nur noch `play()` nötig ist.
+    Die Größe wird über die Dateigröße abgeschätzt; überschreitet der Cache
+    `max_bytes` oder `max_entries`, werden die am längsten unbenutzten Einträge
+    freigegeben. Der gerade aktive Eintrag wird nie verdrängt.
+    """
+
+    def __init__(self, instance, audio_dir, max_bytes=256 * 1024 * 1024, max_entries=8):
+        self.instance = instance
+        self.audio_dir = audio_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.active = None
+
+    def path_for(self, name):
+        return os.path.abspath(os.path.join(self.audio_dir, f"{name}.mp3"))
+
+    def _new_media(self, path, start_paused):
+        media = self.instance.media_new(path)
+        media.add_option(":no-video")
+        if start_paused:
+            media.add_option(":start-paused")
+        return media
+
+    def warm(self, name):
+        """Bereitet die Audiodatei eines Cues vor; bereits vorbereitete Cues werden nur aufgefrischt."""
+        if name in self.entries:
+            self.entries.move_to_end(name)
+            return self.entries[name]
+
+        path = self.path_for(name)
+        if not os.path.exists(path):
+            logger.error("Datei nicht gefunden: %s", path)
+            return None
+
+        media = self._new_media(path, start_paused=True)
+        media.parse_with_options(vlc.MediaParseFlag.local, 0)  # Parsen läuft im VLC-Thread
+        player = self.instance.media_player_new()
+        player.set_media(media)
+        player.play()  # Öffnet die Datei und hält bei 0 an
+
+        entry = CachedMedia(path, media, player, os.path.getsize(path))
+        self.entries[name] = entry
+        self.total_bytes += entry.size
+        logger.info("Audio %s vorgeladen (%.1f MB).", name, entry.size / 1024 / 1024)
+        self._evict(keep=name)
+        return entry
+
+    def take(self, name):
+        """Gibt den startbereiten Player eines Cues zurück und markiert ihn als aktiv."""
+        entry = self.warm(name)
+        if entry is None:
+            return None
+
+        if entry.player.get_state() != vlc.State.Paused:
+            # Vorlauf nicht abgeschlossen oder bereits abgespielt: ohne Start-Pause neu laden
+            media = self._new_media(entry.path, start_paused=False)
+            entry.player.set_media(media)
+            entry.media.release()
+            entry.media = media
+
+        self.active = name
+        return entry.player
+
+    def _evict(self, keep=None):
+        for name in list(self.entries):
+            if self.total_bytes <= self.max_bytes and len(self.entries) <= self.max_entries:
+                break
+            if name in (keep, self.active):
+                continue
+            entry = self.entries.pop(name)
+            self.total_bytes -= entry.size
+            entry.release()
+            logger.info("Audio %s aus dem Cache entfernt.", name)
+
+    def clear(self):
+        """Gibt alle Player und Medien frei."""
+        for entry in self.entries.values():
+            entry.release()
+        self.entries.clear()
+        self.total_bytes = 0
+        self.active = None
@@ -0,0 +1,209 @@
+import time
+import asyncio
+import logging
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+
+logger = logging.getLogger("controller")
+
+
+# Bucket-Grenzen in Millisekunden
+DEFAULT_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SKEW_BUCKETS_MS = (-100, -25, -10, -5, -2, -1, 0, 1, 2, 5, 10, 25, 100)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Zeitpunkt (time.perf_counter) des OSC-Empfangs für den aktuell laufenden Befehl
+received_at = contextvars.ContextVar("received_at", default=None)
+
+
+def elapsed_since_receipt_ms():
+    """Millisekunden seit Empfang des OSC-Befehls, der den aktuellen Task ausgelöst hat."""
+    start = received_at.get()
+    return None if start is None else (time.perf_counter() - start) * 1000
+
+
+def _quantile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """Latenz-Histogramm mit festen Buckets und einem Fenster der letzten Werte für Quantile."""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS_MS, window=1024):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.series = {}  # Labels -> [Bucket-Zähler, Summe, Anzahl, letzte Werte]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * len(self.buckets), 0.0, 0, deque(maxlen=self.window)]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+        series[3].append(value)
+
+    def quantile(self, q, **labels):
+        """Quantil über die letzten Werte einer Serie (None, falls noch keine Werte)."""
+        series = self.series.get(tuple(sorted(labels.items())))
+        if not series or not series[3]:
+            return None
+        return _quantile(sorted(series[3]), q)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        quantile_lines = [f"# TYPE {self.name}_quantiles gauge"]
+        for key, (counts, total, count, recent) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+            values = sorted(recent)
+            for q in QUANTILES:
+                quantile_lines.append(
+                    f"{self.name}_quantiles{_format_labels(key + (('quantile', q),))} {_quantile(values, q)}"
+                )
+        return lines + quantile_lines
+
+
+class Gauge:
+    """Momentanwert je Label-Kombination."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def set(self, value, **labels):
+        self.series[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in self.series.items()]
+        return lines
+
+
+class Counter:
+    """Monoton steigender Zähler je Label-Kombination."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in self.series.items()]
+        return lines
+
+
+class Registry:
+    """Sammelt alle Metriken des Controllers und rendert sie im Prometheus-Textformat."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS_MS):
+        return self.metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text):
+        return self.metrics.setdefault(name, Gauge(name, help_text))
+
+    def counter(self, name, help_text):
+        return self.metrics.setdefault(name, Counter(name, help_text))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_DURATION = registry.histogram(
+    "controller_stage_duration_ms", "Dauer einzelner Schritte (HTTP, VLC, OSC) in ms."
+)
+STAGE_SINCE_RECEIPT = registry.histogram(
+    "controller_stage_since_receipt_ms", "Zeit vom OSC-Empfang bis zum Abschluss eines Schritts in ms."
+)
+COMMAND_DURATION = registry.histogram(
+    "controller_command_duration_ms", "Zeit vom OSC-Empfang bis zum Ende des Handlers in ms."
+)
+STOP_LATENCY = registry.histogram(
+    "controller_stop_latency_ms", "Zeit vom OSC-Empfang von /stop bis zum Abschluss von POST /stop in ms."
+)
+CUE_SKEW = registry.histogram(
+    "controller_cue_skew_ms", "Versatz Audio minus Feuerwerk beim Cue-Start in ms.", SKEW_BUCKETS_MS
+)
+
+
+@contextmanager
+def track(stage, **labels):
+    """Misst die Dauer eines Schritts und die Zeit seit dem OSC-Empfang des auslösenden Befehls."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe((time.perf_counter() - start) * 1000, stage=stage, **labels)
+        since = elapsed_since_receipt_ms()
+        if since is not None:
+            STAGE_SINCE_RECEIPT.observe(since, stage=stage, **labels)
+
+
+async def start_metrics_server(host, port, ready=None, events=None):
+    """Startet einen minimalen HTTP-Server, der `GET /metrics` im Prometheus-Textformat beantwortet.
+
+    `GET /ready` antwortet mit 200, sobald das Event `ready` gesetzt ist, sonst mit 503.
+    `GET /events` liefert die letzten Log-Ereignisse aus dem Ringpuffer `events`.
+    """
+
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # Header werden nicht benötigt
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) >= 2 and parts[0] == "GET" else None
+            if path == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            elif path == "/ready" and ready is not None:
+                status, body = ("200 OK", b"ready\n") if ready.is_set() else ("503 Service Unavailable", b"starting\n")
+            elif path == "/events" and events is not None:
+                status, body = "200 OK", events.dump().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Metriken unter http://%s:%s/metrics erreichbar.", host, port)
+    return server
@@ -0,0 +1,124 @@
+import json
+import httpx
+import asyncio
+import logging
+
+
+logger = logging.getLogger("controller")
+
+
+class StatusMirror:
+    """Lokale, revisionierte Kopie der Sequenz-Status des Simulators.
+
+    Der Mirror folgt dem Änderungs-Feed (`GET /api/sequences/events`) und übernimmt
+    zusätzlich die Antworten der eigenen PATCH-/POST-Aufrufe sofort. Lücken in den
+    Revisionen erzwingen einen neuen Snapshot; `verify` prüft per `If-None-Match`
+    gegen die Revision des Simulators und repariert Abweichungen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.statuses = {}
+        self.revision = None
+        self.synced = False
+
+    def status(self, name):
+        return self.statuses.get(name)
+
+    def holder(self, *statuses):
+        """Name der Sequenz in einem der Status (z. B. 'running', 'paused'), sonst None."""
+        return next((name for name, status in self.statuses.items() if status in statuses), None)
+
+    def sequences(self):
+        return [{"name": name, "status": status} for name, status in self.statuses.items()]
+
+    def load_snapshot(self, sequences, revision):
+        self.statuses = {sequence["name"]: sequence["status"] for sequence in sequences}
+        self.revision = revision
+
+    def apply_sequences(self, sequences, deleted=()):
+        """Übernimmt Sequenzen aus der Antwort eines eigenen Aufrufs."""
+        for sequence in sequences:
+            self.statuses[sequence["name"]] = sequence["status"]
+        for name in deleted:
+            self.statuses.pop(name, None)
+
+    def apply_stop(self):
+        """Spiegelt `POST /stop` (Antwort ohne Inhalt): die laufende bzw. pausierte Sequenz ist gestoppt."""
+        for name, status in self.statuses.items():
+            if status in ("running", "paused"):
+                self.statuses[name] = "stopped"
+
+    def apply_change(self, change):
+        """Wendet eine Änderung aus dem Feed an; False bei einer Lücke in den Revisionen."""
+        if self.revision is not None and change["revision"] <= self.revision:
+            return True
+        if self.revision is None or change["revision"] != self.revision + 1:
+            return False
+
+        if change["type"] == "update":
+            self.statuses[change["sequence"]["name"]] = change["sequence"]["status"]
+        elif change["type"] == "delete":
+            self.statuses.pop(change["name"], None)
+        elif change["type"] == "reset":
+            self.statuses.clear()
+        self.revision = change["revision"]
+        return True
+
+    async def follow(self, transport, retry_delay=1.0):
+        """Hält den Mirror über den Änderungs-Feed aktuell (läuft bis zum Abbruch)."""
+        while True:
+            headers = {} if self.revision is None else {"Last-Event-ID": str(self.revision)}
+            try:
+                async with transport.stream("GET", f"{self.path}/events", headers=headers) as response:
+                    # Mit bekannter Revision schickt der Simulator die verpassten Änderungen nach
+                    self.synced = self.revision is not None and response.status_code == 200
+                    async for kind, data in _sse_events(response):
+                        if kind == "snapshot":
+                            self.load_snapshot(data["sequences"], data["revision"])
+                            self.synced = True
+                            logger.info("Status-Mirror synchronisiert (Revision %s).", self.revision)
+                        elif kind == "change" and not self.apply_change(data):
+                            logger.warning("Lücke im Änderungs-Feed bei Revision %s – lade neu.", data['revision'])
+                            self.revision = None
+                            break
+            except httpx.HTTPError as e:
+                logger.warning("Änderungs-Feed nicht erreichbar: %r", e)
+            self.synced = False
+            await asyncio.sleep(retry_delay)
+
+    async def verify(self, transport, **kwargs):
+        """Gleicht den Mirror per bedingter Anfrage ab; gibt True zurück, wenn er aktuell war."""
+        headers = {} if self.revision is None else {"If-None-Match": f'"{self.revision}"'}
+        kwargs.setdefault("endpoint", "list")
+        response = await transport.get(self.path, headers=headers, **kwargs)
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError("Sequenzliste nicht abrufbar", request=response.request, response=response)
+
+        sequences = response.json()
+        revision = int(response.headers.get("ETag", "0").strip('"'))
+        actual = {sequence["name"]: sequence["status"] for sequence in sequences}
+        if self.revision is not None and actual != self.statuses:
+            drift = sorted(name for name in actual.keys() | self.statuses.keys()
+                           if actual.get(name) != self.statuses.get(name))
+            logger.warning("Status-Mirror weicht ab (%s) – repariert.", ', '.join(drift))
+        self.load_snapshot(sequences, revision)
+        return False
+
+
+async def _sse_events(response):
+    """Zerlegt einen Server-Sent-Events-Stream in (Ereignistyp, JSON-Daten)."""
+    kind, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield kind, json.loads("\n".join(data))
+            kind, data = "message", []
+        elif line.startswith(":"):
+            continue  # Keep-Alive-Kommentar
+        elif line.startswith("event:"):
+            kind = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from pythonosc import osc_bundle_builder
+from pythonosc.osc_message_builder import OscMessageBuilder
+from .metrics import registry, track
+
+
+logger = logging.getLogger("controller")
+
+
+MAX_QUEUE = 256  # Nachrichten, die höchstens auf den Versand warten; darüber wird verworfen
+MAX_BUNDLE = 16  # Nachrichten je OSC-Bundle
+MAX_DATAGRAM = 1400  # Bytes je UDP-Paket (unterhalb der üblichen MTU)
+
+OSC_DROPPED = registry.counter(
+    "controller_osc_dropped_total", "Verworfene OSC-Nachrichten an OnTime (Warteschlange voll)."
+)
+
+
+class _Sink(asyncio.DatagramProtocol):
+    def error_received(self, exc):
+        logger.warning("OSC-Versand an OnTime fehlgeschlagen: %r", exc)
+
+
+class OscOutput:
+    """Dauerhafter OSC-Kanal an OnTime.
+
+    `send()` legt die Nachricht nur in eine begrenzte Warteschlange und kehrt sofort zurück;
+    ein Hintergrund-Task baut die Pakete und versendet sie über einen einzigen UDP-Socket.
+    Warten mehrere Nachrichten, gehen sie gemeinsam als OSC-Bundle (Timetag "sofort") raus.
+    Ist die Warteschlange voll, wird die neue Nachricht verworfen und gezählt.
+    """
+
+    def __init__(self, host, port, max_queue=MAX_QUEUE, max_bundle=MAX_BUNDLE):
+        self.address = (host, port)
+        self.max_bundle = max_bundle
+        self.queue = asyncio.Queue(max_queue)
+        self.dropped = 0
+        self.transport = None
+        self.sender = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(_Sink, remote_addr=self.address)
+        self.sender = asyncio.create_task(self._run())
+
+    def send(self, address, value):
+        """Reiht eine Nachricht ein, ohne auf den Versand zu warten."""
+        with track("osc_send"):
+            try:
+                self.queue.put_nowait((address, value))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                OSC_DROPPED.inc()
+                logger.warning("OSC-Warteschlange voll – Nachricht %s verworfen.", address)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_bundle and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            with track("osc_flush"):
+                for dgram in self._packets(batch):
+                    self.transport.sendto(dgram)
+            for address, value in batch:
+                logger.info("OSC-Nachricht an OnTime gesendet: %s -> %s", address, value)
+
+    def _packets(self, batch):
+        """Fasst die Nachrichten zu möglichst wenigen Paketen bis MAX_DATAGRAM Bytes zusammen."""
+        messages = [_build_message(address, value) for address, value in batch]
+        packets, group, size = [], [], 16  # "#bundle" + Timetag
+        for message in messages:
+            if group and size + 4 + message.size > MAX_DATAGRAM:
+                packets.append(_bundle(group))
+                group, size = [], 16
+            group.append(message)
+            size += 4 + message.size
+        if group:
+            packets.append(_bundle(group))
+        return packets
+
+    async def close(self):
+        """Versendet noch wartende Nachrichten und schließt den Socket."""
+        if self.sender is not None:
+            self.sender.cancel()
+            await asyncio.gather(self.sender, return_exceptions=True)
+        if self.transport is not None:
+            batch = []
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            for dgram in self._packets(batch):
+                self.transport.sendto(dgram)
+            self.transport.close()
+
+
+def _build_message(address, value):
+    builder = OscMessageBuilder(address=address)
+    for arg in value if isinstance(value, (list, tuple)) else [value]:
+        builder.add_arg(arg)
+    return builder.build()
+
+
+def _bundle(messages):
+    # Einzelne Nachrichten ohne Bundle-Hülle, damit OnTime sie wie bisher empfängt
+    if len(messages) == 1:
+        return messages[0].dgram
+    builder = osc_bundle_builder.OscBundleBuilder(osc_bundle_builder.IMMEDIATELY)
+    for message in messages:
+        builder.add_content(message)
+    return builder.build().dgram
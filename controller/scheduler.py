@@ -0,0 +1,107 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from .metrics import COMMAND_DURATION, elapsed_since_receipt_ms, received_at
+
+
+logger = logging.getLogger("controller")
+
+
+# Prioritäten der OSC-Befehle (kleiner = wichtiger)
+PRIORITY_STOP = 0  # Notaus: bricht alle weniger wichtigen Befehle ab
+PRIORITY_PAUSE = 1  # Pause: überholt die Warteschlange, wartet aber auf den laufenden Befehl
+PRIORITY_CUE = 2  # Start eines Events
+PRIORITY_STAGE = 3  # Vorbereitung: next_event, first_stage, second_stage
+
+
+class CommandScheduler:
+    """Verteilt OSC-Befehle nach Priorität auf Tasks.
+
+    Alle Befehle außer `/stop` laufen nacheinander; ab `PRIORITY_CUE` in
+    Eingangsreihenfolge. `/pause` überholt die wartenden Befehle, wartet aber auf den
+    gerade laufenden – sonst könnte die Pause vor der Transaktion eines laufenden
+    `/start` beim Simulator ankommen. `/stop` läuft sofort und bricht alle laufenden
+    und wartenden Befehle niedrigerer Priorität ab, damit der Notaus nie hinter einem
+    langsamen Start wartet.
+    """
+
+    def __init__(self, preempt_level=PRIORITY_STOP, serial_from=PRIORITY_CUE):
+        self.preempt_level = preempt_level
+        self.serial_from = serial_from
+        self.active = {}  # Task -> Priorität
+        self.lane_busy = False
+        self.lane_waiters = []  # Heap (Rang, Eingangsnummer, Future)
+        self.arrivals = itertools.count()
+
+    def map(self, dispatcher, address, handler, priority):
+        """Registriert einen async-Handler mit Priorität am Dispatcher."""
+        def callback(osc_address, *args):
+            self.submit(priority, handler, osc_address, *args)
+        dispatcher.map(address, callback)
+
+    def submit(self, priority, handler, address, *args):
+        """Startet einen Befehl als Task und bricht bei Bedarf weniger wichtige Befehle ab."""
+        received_at.set(time.perf_counter())
+        if priority <= self.preempt_level:
+            self.cancel_below(priority)
+        task = asyncio.get_running_loop().create_task(self._run(priority, handler, address, *args))
+        self.active[task] = priority
+        task.add_done_callback(self._finish)
+        return task
+
+    def cancel_below(self, priority):
+        """Bricht alle laufenden und wartenden Befehle mit niedrigerer Priorität ab."""
+        for task, task_priority in list(self.active.items()):
+            if task_priority > priority and not task.done():
+                logger.warning("Breche Befehl mit Priorität %s zugunsten Priorität %s ab.", task_priority, priority)
+                task.cancel()
+
+    @asynccontextmanager
+    async def _lane(self, priority):
+        """Reiht den Befehl ein; Befehle unter `serial_from` kommen vor allen wartenden dran."""
+        if self.lane_busy or self.lane_waiters:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.lane_waiters, (min(priority, self.serial_from), next(self.arrivals), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release_lane()  # Lane wurde bereits übergeben
+                raise
+        self.lane_busy = True
+        try:
+            yield
+        finally:
+            self._release_lane()
+
+    def _release_lane(self):
+        # Die Lane direkt an den nächsten wartenden Befehl übergeben (abgebrochene überspringen)
+        while self.lane_waiters:
+            future = heapq.heappop(self.lane_waiters)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.lane_busy = False
+
+    async def _run(self, priority, handler, address, *args):
+        try:
+            if priority <= self.preempt_level:
+                return await handler(address, *args)
+            async with self._lane(priority):
+                return await handler(address, *args)
+        finally:
+            COMMAND_DURATION.observe(elapsed_since_receipt_ms(), address=address)
+
+    def _finish(self, task):
+        self.active.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Fehler im OSC-Handler: %r", task.exception())
+
+    async def shutdown(self):
+        """Bricht alle offenen Befehle ab und wartet auf deren Ende."""
+        for task in list(self.active):
+            task.cancel()
+        await asyncio.gather(*self.active, return_exceptions=True)
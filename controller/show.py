@@ -0,0 +1,30 @@
+import json
+from collections import Counter
+
+
+def load_manifest(path):
+    """Lädt ein Show-Manifest (JSON) und gibt die Cue-Namen in Reihenfolge zurück."""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    names = [str(cue["name"]) for cue in manifest.get("cues", [])]
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Doppelte Cue-Namen im Manifest {path}: {', '.join(duplicates)}")
+    return names
+
+
+def plan_reconciliation(desired, sequences):
+    """Berechnet die minimale Änderung, um den Simulator auf das Manifest zu bringen.
+
+    `desired` sind die Cue-Namen aus dem Manifest, `sequences` die aktuelle Liste des
+    Simulators (`GET /api/sequences`). Fehlende Sequenzen werden angelegt, überzählige
+    gelöscht und alle nicht mehr im Status `saved` befindlichen zurückgesetzt.
+    """
+    wanted = set(desired)
+    present = {sequence["name"]: sequence["status"] for sequence in sequences}
+    return {
+        "create": [name for name in desired if name not in present],
+        "delete": [name for name in present if name not in wanted],
+        "reset": [name for name, status in present.items() if name in wanted and status != "saved"],
+    }
@@ -0,0 +1,138 @@
+"""Startet Simulator (mit Web-UI) und Controller gleichzeitig und überwacht beide.
+
+    python -m controller.supervisor
+
+Jeder Prozess gilt als bereit, sobald seine HTTP-Readiness-Probe mit 200 antwortet:
+der Simulator unter `/api/sequences`, der Controller unter `/ready` seines Metrik-Servers
+(erst nach dem Abgleich der Sequenzen). Abgestürzte Prozesse werden mit wachsender
+Wartezeit neu gestartet.
+"""
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import httpx
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("supervisor")
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+
+PROBE_INTERVAL = 0.1  # Sekunden zwischen zwei Readiness-Proben
+PROBE_TIMEOUT = httpx.Timeout(0.5)
+BACKOFF_INITIAL = 0.5  # Wartezeit vor dem ersten Neustart, verdoppelt sich bis BACKOFF_MAX
+BACKOFF_MAX = 10.0
+STABLE_AFTER = 30.0  # Lief ein Prozess so lange, beginnt die Wartezeit wieder bei BACKOFF_INITIAL
+STOP_TIMEOUT = 5.0
+
+
+class Child:
+    """Ein überwachter Prozess mit Readiness-Probe."""
+
+    def __init__(self, name, argv, ready_url):
+        self.name = name
+        self.argv = argv
+        self.ready_url = ready_url
+        self.process = None
+        self.ready = asyncio.Event()
+        self.restarts = 0
+
+    async def run(self, client, stopping):
+        """Startet den Prozess und startet ihn nach einem Absturz neu, bis `stopping` gesetzt ist."""
+        backoff = BACKOFF_INITIAL
+        while not stopping.is_set():
+            started = time.perf_counter()
+            self.process = await asyncio.create_subprocess_exec(
+                *self.argv, cwd=PROJECT_DIR, env={**os.environ, "PYTHONUNBUFFERED": "1"}
+            )
+            logger.info("%s gestartet (PID %s).", self.name, self.process.pid)
+            probe = asyncio.create_task(self._probe(client, started))
+            code = await self.process.wait()
+            probe.cancel()
+            self.ready.clear()
+            if stopping.is_set():
+                break
+
+            if time.perf_counter() - started >= STABLE_AFTER:
+                backoff = BACKOFF_INITIAL
+            self.restarts += 1
+            logger.error("%s beendet (Code %s) – Neustart %s in %.1f s.", self.name, code, self.restarts, backoff)
+            try:
+                await asyncio.wait_for(stopping.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    async def _probe(self, client, started):
+        while True:
+            try:
+                response = await client.get(self.ready_url)
+                if response.status_code == 200:
+                    self.ready.set()
+                    logger.info("%s bereit nach %.2f s.", self.name, time.perf_counter() - started)
+                    return
+            except httpx.RequestError:
+                pass
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    async def stop(self):
+        """Beendet den Prozess (SIGTERM, nach STOP_TIMEOUT SIGKILL)."""
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("%s reagiert nicht – wird beendet.", self.name)
+            self.process.kill()
+            await self.process.wait()
+
+
+async def report_ready(children, started):
+    """Meldet, wann alle Prozesse erstmals bereit sind (Kaltstart bis zum ersten Cue)."""
+    await asyncio.gather(*(child.ready.wait() for child in children))
+    logger.info("Bereit für den ersten Cue nach %.2f s.", time.perf_counter() - started)
+
+
+async def supervise():
+    started = time.perf_counter()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass  # Windows: Strg+C kommt als KeyboardInterrupt an
+
+    children = [
+        Child(
+            "Simulator",
+            [sys.executable, "-m", "uvicorn", "simulator.app:app", "--host", "127.0.0.1", "--port", "8000"],
+            "http://127.0.0.1:8000/api/sequences",
+        ),
+        Child("Controller", [sys.executable, "-m", "controller.main"], f"http://127.0.0.1:{METRICS_PORT}/ready"),
+    ]
+    async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
+        runners = [asyncio.create_task(child.run(client, stopping)) for child in children]
+        reporter = asyncio.create_task(report_ready(children, started))
+        try:
+            await stopping.wait()
+        finally:
+            stopping.set()
+            logger.info("Beende alle Prozesse...")
+            reporter.cancel()
+            for child in reversed(children):
+                await child.stop()
+            await asyncio.gather(*runners, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(supervise())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,65 @@
+import time
+import asyncio
+import contextvars
+from pythonosc import osc_packet
+from pythonosc.dispatcher import Dispatcher
+
+
+# Zielzeitpunkt (time.perf_counter) aus dem Timetag eines OSC-Bundles; None = sofort
+cue_deadline = contextvars.ContextVar("cue_deadline", default=None)
+
+
+class TimedDispatcher(Dispatcher):
+    """Dispatcher, der bei OSC-Bundles mit Timetag nicht blockierend wartet.
+
+    python-osc wartet bei Bundles mit Timetag in der Zukunft per `time.sleep`,
+    was die Event-Loop blockieren würde. Hier wird der Timetag stattdessen in
+    eine monotone Deadline umgerechnet und über `cue_deadline` an den Handler
+    weitergereicht.
+    """
+
+    def call_handlers_for_packet(self, data, client_address):
+        try:
+            packet = osc_packet.OscPacket(data)
+        except osc_packet.ParseError:
+            return
+
+        for timed_msg in packet.messages:
+            delay = timed_msg.time - time.time()
+            token = cue_deadline.set(time.perf_counter() + delay if delay > 0 else None)
+            try:
+                for handler in self.handlers_for_address(timed_msg.message.address):
+                    handler.invoke(client_address, timed_msg.message)
+            finally:
+                cue_deadline.reset(token)
+
+
+class LatencyEstimator:
+    """Gleitender Mittelwert (EWMA) der gemessenen Latenz einer Verbindung in Sekunden."""
+
+    def __init__(self, initial, alpha=0.2):
+        self.value = initial
+        self.alpha = alpha
+
+    def update(self, sample):
+        self.value += self.alpha * (sample - self.value)
+        return self.value
+
+
+async def sleep_until(deadline, spin=0.002):
+    """Wartet bis `deadline` (time.perf_counter); die letzten Millisekunden ohne Timer-Ungenauigkeit."""
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        await asyncio.sleep(remaining - spin)
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(0)
+
+
+async def wait_until_playing(player, timeout=0.5):
+    """Gibt den Zeitpunkt (time.perf_counter) zurück, ab dem VLC abspielt, oder None nach `timeout`."""
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        if player.is_playing():
+            return time.perf_counter()
+        await asyncio.sleep(0.001)
+    return None
@@ -0,0 +1,104 @@
+import time
+import httpx
+import asyncio
+import logging
+from .metrics import track
+from .breaker import CircuitBreaker, CircuitOpenError
+
+
+logger = logging.getLogger("controller")
+
+
+# Standard-Timeouts (Sekunden): Verbindungsaufbau kurz, Antwort etwas länger
+DEFAULT_TIMEOUT = httpx.Timeout(5.0, connect=1.0)
+
+# Timeouts je Endpunkt – Stopp & Pause müssen schnell scheitern, Reset darf länger dauern
+ENDPOINT_TIMEOUTS = {
+    "stop": httpx.Timeout(2.0, connect=0.5),
+    "pause": httpx.Timeout(2.0, connect=0.5),
+    "resume": httpx.Timeout(2.0, connect=0.5),
+    "running": httpx.Timeout(2.0, connect=0.5),
+    "transitions": httpx.Timeout(2.0, connect=0.5),
+    "reset": httpx.Timeout(10.0, connect=1.0),
+    "heartbeat": httpx.Timeout(0.5, connect=0.25),
+}
+
+# Endpunkte, deren erfolgreiche Anfragen nur im Debug-Level protokolliert werden (sonst 1 Eintrag/s im Leerlauf)
+QUIET_ENDPOINTS = {"heartbeat"}
+
+# Streams (Änderungs-Feed): der Simulator sendet alle 15 s ein Keep-Alive
+STREAM_TIMEOUT = httpx.Timeout(5.0, connect=1.0, read=45.0)
+
+# Verbindungspool: wenige, dauerhaft offene Verbindungen zum Simulator
+DEFAULT_LIMITS = httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=300)
+
+
+class FireworksTransport:
+    """Langlebiger asynchroner HTTP-Client mit Keep-Alive-Pool für alle Anfragen an die Feuerwerkssteuerung."""
+
+    def __init__(self, base_url, timeouts=None, limits=DEFAULT_LIMITS, breaker=None):
+        self.timeouts = dict(ENDPOINT_TIMEOUTS if timeouts is None else timeouts)
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=DEFAULT_TIMEOUT, limits=limits)
+
+    async def request(self, method, path, endpoint=None, probe=False, **kwargs):
+        """Sendet eine Anfrage über den gemeinsamen Pool und protokolliert die Dauer.
+
+        `endpoint` wählt den Timeout aus `ENDPOINT_TIMEOUTS`; ohne Angabe gilt `DEFAULT_TIMEOUT`.
+        Netzwerkfehler (`httpx.RequestError`) werden an den Aufrufer weitergereicht; bei offenem
+        Circuit Breaker sofort als `CircuitOpenError`. Nur Probe-Anfragen (`probe=True`) dürfen
+        im Zustand half_open durch.
+        """
+        if not self.breaker.allow(probe):
+            raise CircuitOpenError(f"Circuit Breaker offen – {method} {path} abgewiesen")
+
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, DEFAULT_TIMEOUT))
+        start = time.perf_counter()
+        try:
+            with track("http", endpoint=endpoint or "other"):
+                response = await self.client.request(method, path, **kwargs)
+        except httpx.RequestError:
+            self.breaker.record_failure()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            logger.info("%s %s - fehlgeschlagen nach %.1f ms", method, path, elapsed_ms)
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        level = logging.DEBUG if endpoint in QUIET_ENDPOINTS and response.status_code < 400 else logging.INFO
+        logger.log(level, "%s %s - Status: %s - Dauer: %.1f ms", method, path, response.status_code, elapsed_ms)
+        return response
+
+    def stream(self, method, path, **kwargs):
+        """Öffnet eine Streaming-Antwort (z. B. Server-Sent Events) über den gemeinsamen Pool."""
+        kwargs.setdefault("timeout", STREAM_TIMEOUT)
+        return self.client.stream(method, path, **kwargs)
+
+    async def wait_ready(self, path, interval=0.1, timeout=httpx.Timeout(0.5)):
+        """Wartet, bis `path` mit einem Status unter 500 antwortet (ohne Circuit Breaker)."""
+        while True:
+            try:
+                response = await self.client.get(path, timeout=timeout)
+                if response.status_code < 500:
+                    return
+            except httpx.RequestError:
+                pass
+            await asyncio.sleep(interval)
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("DELETE", path, **kwargs)
+
+    async def close(self):
+        """Schließt alle offenen Verbindungen des Pools."""
+        await self.client.aclose()
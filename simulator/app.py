@@ -1,29 +1,64 @@
 import os
-import httpx
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from typing import Annotated, Literal
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from .assets import AssetStore, brotli
+from .feed import ChangeFeed
+from .engine import StateEngine
+from .listing import ListingCache, serialize
+from .metrics import route_timings, timing_middleware
+from .state import ConflictError, open_backend
 
-app = FastAPI(title="Feuerwerk-Simulator", version="1.0.0")
+
+logger = logging.getLogger("simulator")
+
+
+# Zustandsspeicher: 'memory' (ein Worker) oder 'sqlite:<Pfad>' (mehrere Worker, überlebt Neustarts)
+backend = open_backend(os.environ.get("SIMULATOR_STATE", "memory"))
+feed = ChangeFeed(backend)
+engine = StateEngine(backend, feed)
+listing_cache = ListingCache()
+
+# Show für die Pfade ohne Namensraum (/api/sequences)
+DEFAULT_SHOW = "default"
+SHOW_NAME_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if brotli is None:
+        logger.warning("Brotli nicht installiert – Web-UI wird nur mit gzip komprimiert (pip install brotli).")
+    # Bei gemeinsamem Speicher die Änderungen anderer Worker in den Feed übernehmen
+    poller = asyncio.create_task(feed.poll()) if backend.shared else None
+    yield
+    if poller is not None:
+        poller.cancel()
+
+
+app = FastAPI(title="Feuerwerk-Simulator", version="1.0.0", lifespan=lifespan)
 
 # Berechne das Verzeichnis der statischen Web‑UI-Dateien:
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 WEBAPP_STATIC_DIR = os.path.join(BASE_DIR, "../webapp/static")
 
-# Mounte die statischen Dateien unter "/static"
-app.mount("/static", StaticFiles(directory=WEBAPP_STATIC_DIR, html = True), name="styles.css")
+# Dateien der Web-UI einmalig laden und vorkomprimieren; SIMULATOR_RELOAD_ASSETS=1 lädt Änderungen neu
+assets = AssetStore(WEBAPP_STATIC_DIR, reload=os.environ.get("SIMULATOR_RELOAD_ASSETS") == "1")
 
 
 # Liefere index.html an der Root-URL aus:
-@app.get("/api/sequences", response_class=HTMLResponse, summary="Startseite der Web-UI")
-def read_index():
-    index_path = os.path.join(WEBAPP_STATIC_DIR, "index.html")
-    with open(index_path, encoding="utf-8") as f:
-        return f.read()
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse, summary="Startseite der Web-UI")
+async def read_index(request: Request):
+    return assets.response(request, assets.index)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def read_static(request: Request, path: str):
+    return assets.response(request, path)
 
 
 app.add_middleware(
@@ -32,106 +67,355 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.middleware("http")(timing_middleware)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, summary="Antwortzeiten je Route (Prometheus-Textformat).")
+async def read_metrics():
+    return PlainTextResponse(route_timings.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.exception_handler(ConflictError)
+async def conflict_handler(request: Request, exc: ConflictError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+SequenceStatus = Literal["saved", "first_stage", "second_stage", "running", "paused", "stopped"]
 
 
 class FireworkSequence(BaseModel):
     name: str
-    status: Literal[
-        "saved", "first_stage", "second_stage", "running", "paused", "stopped"
-    ] = "saved"
+    status: SequenceStatus = "saved"
+
+
+class Show(BaseModel):
+    name: str
+    revision: int
+
+
+class TransitionStep(BaseModel):
+    action: Literal["first_stage", "second_stage", "running", "pause", "resume", "start", "stop"]
+    name: str | None = None
+    expect: list[SequenceStatus] | None = None
+
+
+class TransitionResult(BaseModel):
+    revision: int
+    sequences: list[FireworkSequence]
+
+
+class BulkChange(BaseModel):
+    create: list[str] = []
+    delete: list[str] = []
+    reset: list[str] = []
+
+
+class BulkResult(BaseModel):
+    revision: int
+    sequences: list[FireworkSequence]
+    deleted: list[str]
 
 
-sequence_store = {}
 next_map = {
     "saved": "first_stage",
     "first_stage": "second_stage",
     "second_stage": "running",
 }
-current_stages = {
-    "running": None,
-    "first_stage": None,
-    "second_stage": None,
+# Status, die jeweils nur eine Sequenz je Show belegen darf; eine pausierte Sequenz belegt 'running' weiter
+stage_holders = {
+    "running": ("running", "paused"),
+    "first_stage": ("first_stage",),
+    "second_stage": ("second_stage",),
 }
 
 
-def next_stage(sequence: FireworkSequence, stage: str):
-    if current_stages[stage] is not None:
+def _require(tx, name: str) -> str:
+    status = tx.status(name)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Sequence not found.")
+    return status
+
+
+def _set_status(tx, name: str, expected: str, status: str):
+    if not tx.compare_and_set(name, expected, status):
+        raise ConflictError(f"Sequence {name} was changed concurrently.")
+
+
+def next_stage(tx, name: str, stage: str):
+    status = _require(tx, name)
+    if tx.holder(*stage_holders[stage]) is not None:
         raise HTTPException(
             status_code=403,
             detail=f"A other sequence is already in {stage}.",
         )
-    if next_map.get(sequence.status) != stage:
+    if next_map.get(status) != stage:
         raise HTTPException(
             status_code=403,
             detail=f"Bad next stage {stage}.",
         )
-    current_stages[sequence.status] = None
-    sequence.status = stage
-    current_stages[sequence.status] = sequence
+    _set_status(tx, name, status, stage)
 
 
-def _get_sequence(name: str):
-    try:
-        return sequence_store[name]
-    except KeyError:
-        raise HTTPException(status_code=404, detail="Sequence not found.") from None
+def pause(tx, name: str):
+    status = _require(tx, name)
+    if status not in ("paused", "running"):
+        raise HTTPException(status_code=403, detail="Sequence not running.")
+    _set_status(tx, name, status, "paused")
+
+
+def resume(tx, name: str):
+    status = _require(tx, name)
+    if status != "paused":
+        raise HTTPException(status_code=403, detail="Sequence is not paused.")
+    _set_status(tx, name, status, "running")
+
+
+def stop(tx) -> str | None:
+    name = tx.holder(*stage_holders["running"])
+    if name is not None:
+        _set_status(tx, name, tx.status(name), "stopped")
+    return name
+
 
+def apply_step(tx, step: TransitionStep):
+    """Führt einen Schritt einer Transaktion aus."""
+    if step.action == "stop":
+        name = tx.holder(*stage_holders["running"])
+        if step.expect is not None and (name is None or tx.status(name) not in step.expect):
+            raise HTTPException(status_code=412, detail="Precondition failed for stop.")
+        stop(tx)
+        return
+
+    if step.name is None:
+        raise HTTPException(status_code=422, detail=f"Action {step.action} requires a name.")
+    status = _require(tx, step.name)
+    if step.expect is not None and status not in step.expect:
+        raise HTTPException(
+            status_code=412,
+            detail=f"Precondition failed: {step.name} is {status}.",
+        )
+    if step.action == "pause":
+        pause(tx, step.name)
+    elif step.action == "resume":
+        resume(tx, step.name)
+    elif step.action == "start":
+        # Start aus second_stage oder Fortsetzen aus paused
+        if status == "paused":
+            resume(tx, step.name)
+        else:
+            next_stage(tx, step.name, "running")
+    else:
+        next_stage(tx, step.name, step.action)
+
+
+def _changed(tx) -> list[FireworkSequence]:
+    return [FireworkSequence(name=name, status=status) for name, status in tx.writes.items() if status is not None]
+
+
+async def _revision(tx, show: str) -> int:
+    """Revision nach dem Commit (ohne Änderungen: die aktuelle Revision der Show)."""
+    return tx.revision if tx.events else await engine.read(backend.revision, show)
+
+
+async def _validate_show(show: Annotated[str, Path(pattern=SHOW_NAME_PATTERN, description="Name der Show")]):
+    pass
 
-GetSequence = Annotated[FireworkSequence, Depends(_get_sequence)]
 
+async def _show_name(request: Request) -> str:
+    return request.path_params.get("show", DEFAULT_SHOW)
 
-@app.get("/api/sequences", summary="Gibt eine Liste aller Feuerwerk-Sequenzen zurück.")
-def get_all_sequences() -> list[FireworkSequence]:
-    return list(sequence_store.values())
 
+ShowName = Annotated[str, Depends(_show_name)]
 
-@app.post(
-    "/api/sequences",
+
+@app.get("/api/shows", summary="Gibt alle Shows mit ihrer aktuellen Revision zurück.")
+async def get_shows() -> list[Show]:
+    return await engine.read(backend.shows)
+
+
+# Alle Sequenz-Endpunkte gibt es je Show unter /api/shows/{show}/sequences
+# und für die Standard-Show weiterhin unter /api/sequences
+sequences = APIRouter()
+
+
+@sequences.get(
+    "",
+    summary="Gibt eine Liste aller Feuerwerk-Sequenzen zurück.",
+    description="Der ETag ist die aktuelle Revision. Stimmt 'If-None-Match' damit überein, "
+    "wird nur 304 ohne Inhalt zurückgegeben.\n"
+    "'status' (mehrfach möglich) filtert nach Status, 'since_revision' liefert nur Sequenzen, "
+    "die danach angelegt oder geändert wurden (Löschungen stehen im Änderungs-Feed).\n"
+    "Mit 'limit' wird seitenweise geliefert; der Header 'X-Next-Cursor' enthält dann den "
+    "Wert für 'cursor', mit dem die nächste Seite abgerufen wird.",
+    responses={
+        304: {"description": "Keine Änderung seit der angegebenen Revision."},
+        400: {"description": "Ungültiger Cursor."},
+    },
+)
+async def get_all_sequences(
+    show: ShowName,
+    status: Annotated[list[SequenceStatus] | None, Query()] = None,
+    since_revision: Annotated[int | None, Query(ge=0)] = None,
+    cursor: str | None = None,
+    limit: Annotated[int | None, Query(ge=1, le=10000)] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> list[FireworkSequence]:
+    revision = await engine.read(backend.revision, show)
+    if if_none_match == f'"{revision}"':
+        return Response(status_code=304, headers={"ETag": if_none_match})
+    try:
+        after = None if cursor is None else int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from None
+
+    statuses = None if status is None else tuple(sorted(set(status)))
+    query = (statuses, since_revision, after, limit)
+    cached = listing_cache.get(show, revision, query)
+    if cached is None:
+        revision, rows, more = await engine.read(backend.query, show, statuses, since_revision, after, limit)
+        cached = (serialize(rows), str(rows[-1][0]) if more else None)
+        listing_cache.put(show, revision, query, *cached)
+    body, next_cursor = cached
+    headers = {"ETag": f'"{revision}"'}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@sequences.post(
+    "",
     summary="Erstellt eine Feuerwerk-Sequenz.",
     description="Der Sequenz-Name muss als Parameter übergeben werden und eindeutig sein.",
     responses={403: {"description": "Sequenz-Name exsistiert bereits."}},
 )
-def create_sequence(name: str) -> FireworkSequence:
-    if name in sequence_store:
-        raise HTTPException(status_code=403, detail="Sequence already exists.")
-    sequence_store[name] = FireworkSequence(name=name)
-    return sequence_store[name]
+async def create_sequence(show: ShowName, name: str) -> FireworkSequence:
+    def change(tx):
+        if tx.status(name) is not None:
+            raise HTTPException(status_code=403, detail="Sequence already exists.")
+        tx.put(name, "saved")
+
+    await engine.run(show, change)
+    return FireworkSequence(name=name)
 
 
-@app.delete("/api/sequences", summary="Setzt die Steuerung zurück (löscht alle Sequenzen).")
-def reset():
-    sequence_store.clear()
-    current_stages["running"] = None
-    current_stages["first_stage"] = None
-    current_stages["second_stage"] = None
+@sequences.delete("", summary="Setzt die Steuerung zurück (löscht alle Sequenzen).")
+async def reset(show: ShowName):
+    await engine.run(show, lambda tx: tx.clear())
 
 
-@app.get(
-    "/api/sequences/{name}",
+@sequences.post(
+    "/bulk",
+    summary="Legt Sequenzen an, löscht oder setzt sie zurück – in einem Aufruf.",
+    description="Reihenfolge: zuerst 'delete', dann 'reset' (Status 'saved'), dann 'create'.\n"
+    "Alle Namen werden vorab geprüft; ist einer ungültig, wird nichts geändert.",
+    responses={
+        403: {"description": "Sequenz-Name exsistiert bereits."},
+        404: {"description": "Sequenz exsistiert nicht."},
+    },
+)
+async def apply_bulk(show: ShowName, change: BulkChange) -> BulkResult:
+    def apply(tx):
+        deleted = set(change.delete)
+        missing = [name for name in change.delete if tx.status(name) is None]
+        missing += [name for name in change.reset if name in deleted or tx.status(name) is None]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Sequence not found: {', '.join(missing)}.")
+        existing = [name for name in change.create if name not in deleted and tx.status(name) is not None]
+        if existing or len(set(change.create)) != len(change.create):
+            raise HTTPException(status_code=403, detail="Sequence already exists.")
+
+        for name in change.delete:
+            tx.delete(name)
+        # Zurückgesetzte Sequenzen geben ihre Freigabestufe automatisch frei
+        for name in change.reset:
+            tx.put(name, "saved")
+        for name in change.create:
+            tx.put(name, "saved")
+
+    tx = await engine.run(show, apply)
+    return BulkResult(revision=await _revision(tx, show), sequences=_changed(tx), deleted=change.delete)
+
+
+@sequences.post(
+    "/transitions",
+    summary="Führt mehrere Statuswechsel atomar aus.",
+    description="Die Schritte werden in der angegebenen Reihenfolge ausgeführt. "
+    "Aktionen: 'first_stage', 'second_stage', 'running', 'pause', 'resume', 'stop' sowie "
+    "'start' (Start aus 'second_stage' oder Fortsetzen aus 'paused').\n"
+    "Mit 'expect' kann je Schritt eine Liste zulässiger Ausgangsstatus angegeben werden.\n"
+    "Schlägt ein Schritt fehl, wird keine Änderung übernommen.",
+    responses={
+        403: {"description": "Ein Statuswechsel ist nicht zulässig."},
+        404: {"description": "Eine Sequenz exsistiert nicht."},
+        409: {"description": "Eine Sequenz wurde gleichzeitig verändert."},
+        412: {"description": "Eine Vorbedingung ('expect') ist nicht erfüllt."},
+    },
+)
+async def apply_transitions(show: ShowName, steps: list[TransitionStep]) -> TransitionResult:
+    def apply(tx):
+        for index, step in enumerate(steps):
+            try:
+                apply_step(tx, step)
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"Step {index}: {e.detail}") from None
+
+    # Alles oder nichts: bei einem Fehler wird die Transaktion nicht übernommen
+    tx = await engine.run(show, apply)
+    return TransitionResult(revision=await _revision(tx, show), sequences=_changed(tx))
+
+
+@sequences.get(
+    "/events",
+    summary="Änderungs-Feed aller Sequenzen (Server-Sent Events).",
+    description="Sendet zuerst einen Snapshot ('snapshot') und danach jede Änderung ('change') "
+    "mit fortlaufender Revisionsnummer. Über den Header 'Last-Event-ID' werden nach einem "
+    "Reconnect nur die verpassten Änderungen gesendet.",
+)
+async def sequence_events(show: ShowName, last_event_id: Annotated[int | None, Header()] = None):
+    return StreamingResponse(
+        feed.stream(show, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@sequences.get(
+    "/{name}",
     summary="Gibt eine Sequenz zurück.",
     description="Der Sequenz-Name muss exsistieren.",
     responses={404: {"description": "Sequenz exsistiert nicht."}},
 )
-def get_sequence(sequence: GetSequence) -> FireworkSequence:
-    return sequence
+async def get_sequence(show: ShowName, name: str) -> FireworkSequence:
+    status = await engine.read(backend.status, show, name)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Sequence not found.")
+    return FireworkSequence(name=name, status=status)
 
 
-@app.delete(
-    "/api/sequences/{name}",
+@sequences.delete(
+    "/{name}",
     summary="Löscht eine Sequenz.",
     description="Der Sequenz-Name muss exsistieren.",
     responses={404: {"description": "Sequenz exsistiert nicht."}},
 )
-def delete_sequence(name: str) -> FireworkSequence:
-    try:
-        return sequence_store.pop(name)
-    except KeyError:
-        raise HTTPException(status_code=404, detail="Sequence not found.") from None
+async def delete_sequence(show: ShowName, name: str) -> FireworkSequence:
+    def change(tx):
+        _require(tx, name)
+        tx.delete(name)
+
+    tx = await engine.run(show, change)
+    return FireworkSequence(name=name, status=tx.expected[name])
+
 
+async def _transition(show: str, name: str, change) -> FireworkSequence:
+    tx = await engine.run(show, lambda tx: change(tx, name))
+    return FireworkSequence(name=name, status=tx.writes[name])
 
-@app.patch(
-    "/api/sequences/{name}/first_stage",
+
+@sequences.patch(
+    "/{name}/first_stage",
     summary="Aktiviere die erste Freigabe (Status: 'first_stage').",
     description="Der Sequenz-Name muss exsistieren.\n"
     "Die Sequenz muss im Status 'saved' sein.'\n"
@@ -141,13 +425,12 @@ def delete_sequence(name: str) -> FireworkSequence:
         404: {"description": "Sequenz exsistiert nicht."},
     },
 )
-def sequence_to_first_stage(sequence: GetSequence) -> FireworkSequence:
-    next_stage(sequence, "first_stage")
-    return sequence
+async def sequence_to_first_stage(show: ShowName, name: str) -> FireworkSequence:
+    return await _transition(show, name, lambda tx, name: next_stage(tx, name, "first_stage"))
 
 
-@app.patch(
-    "/api/sequences/{name}/second_stage",
+@sequences.patch(
+    "/{name}/second_stage",
     summary="Aktiviere die zweite Freigabe (Status: 'second_stage').",
     description="Der Sequenz-Name muss exsistieren.\n"
     "Die Sequenz muss im Status 'first_stage' sein.'\n"
@@ -157,13 +440,12 @@ def sequence_to_first_stage(sequence: GetSequence) -> FireworkSequence:
         404: {"description": "Sequenz exsistiert nicht."},
     },
 )
-def sequence_to_second_stage(sequence: GetSequence) -> FireworkSequence:
-    next_stage(sequence, "second_stage")
-    return sequence
+async def sequence_to_second_stage(show: ShowName, name: str) -> FireworkSequence:
+    return await _transition(show, name, lambda tx, name: next_stage(tx, name, "second_stage"))
 
 
-@app.patch(
-    "/api/sequences/{name}/running",
+@sequences.patch(
+    "/{name}/running",
     summary="Starte die Sequenz (Status: 'running').",
     description="Der Sequenz-Name muss exsistieren.\n"
     "Die Sequenz muss im Status 'second_stage' sein.'\n"
@@ -173,13 +455,12 @@ def sequence_to_second_stage(sequence: GetSequence) -> FireworkSequence:
         404: {"description": "Sequenz exsistiert nicht."},
     },
 )
-def sequence_to_running(sequence: GetSequence) -> FireworkSequence:
-    next_stage(sequence, "running")
-    return sequence
+async def sequence_to_running(show: ShowName, name: str) -> FireworkSequence:
+    return await _transition(show, name, lambda tx, name: next_stage(tx, name, "running"))
 
 
-@app.patch(
-    "/api/sequences/{name}/pause",
+@sequences.patch(
+    "/{name}/pause",
     summary="Pausiere die Sequenz (Status: 'paused').",
     description="Der Sequenz-Name muss exsistieren.\n"
     "Die Sequenz muss im Status 'running' sein.'\n"
@@ -189,16 +470,12 @@ def sequence_to_running(sequence: GetSequence) -> FireworkSequence:
         404: {"description": "Sequenz exsistiert nicht."},
     },
 )
-def pause_sequence(sequence: GetSequence) -> FireworkSequence:
-    if sequence.status in ("paused", "running"):
-        sequence.status = "paused"
-    else:
-        raise HTTPException(status_code=403, detail="Sequence not running.")
-    return sequence
+async def pause_sequence(show: ShowName, name: str) -> FireworkSequence:
+    return await _transition(show, name, pause)
 
 
-@app.patch(
-    "/api/sequences/{name}/resume",
+@sequences.patch(
+    "/{name}/resume",
     summary="Setzt die Sequenz fort (Status: 'running').",
     description="Der Sequenz-Name muss exsistieren.\n"
     "Die Sequenz muss im Status 'paused' sein.'\n"
@@ -208,16 +485,12 @@ def pause_sequence(sequence: GetSequence) -> FireworkSequence:
         404: {"description": "Sequenz exsistiert nicht."},
     },
 )
-def resume_sequence(sequence: GetSequence) -> FireworkSequence:
-    if sequence.status == "paused":
-        sequence.status = "running"
-    else:
-        raise HTTPException(status_code=403, detail="Sequence is not paused.")
-    return sequence
+async def resume_sequence(show: ShowName, name: str) -> FireworkSequence:
+    return await _transition(show, name, resume)
 
 
-@app.post(
-    "/api/sequences/stop",
+@sequences.post(
+    "/stop",
     summary="Stop die Sequenz (Status: 'stopped').",
     description="Der Sequenz-Name muss exsistieren.\n"
     "Die Sequenz muss im Status 'running' oder 'paused' sein.'",
@@ -226,8 +499,9 @@ def resume_sequence(sequence: GetSequence) -> FireworkSequence:
         404: {"description": "Sequenz exsistiert nicht."},
     },
 )
-def stop_sequence() -> None:
-    if current_stages["running"] is not None:
-        current_stages["running"].status = "stopped"
-        current_stages["running"] = None
+async def stop_sequence(show: ShowName) -> None:
+    await engine.run(show, stop)
+
 
+app.include_router(sequences, prefix="/api/sequences")
+app.include_router(sequences, prefix="/api/shows/{show}/sequences", dependencies=[Depends(_validate_show)])
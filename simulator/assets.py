@@ -0,0 +1,142 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+from fastapi import Request, Response
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+# Nur Textformate lohnen die Kompression; sehr kleine Dateien werden unverändert ausgeliefert
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 512
+
+# Versionierte URLs (?v=<Hash>) ändern sich mit dem Inhalt und dürfen beliebig lange gecacht werden
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+STATIC_REF_RE = re.compile(r'((?:href|src)=")/static/([^"?#]+)(")')
+
+
+class Asset:
+    __slots__ = ("body", "content_type", "digest", "variants", "mtime")
+
+    def __init__(self, body, content_type, mtime):
+        self.body = body
+        self.content_type = content_type
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {}  # Content-Encoding -> komprimierter Inhalt
+        if len(body) >= MIN_COMPRESS_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+
+
+class AssetStore:
+    """Hält die Dateien der Web-UI vorkomprimiert im Speicher.
+
+    Jede Datei erhält einen ETag aus dem Hash ihres Inhalts. In `index.html` werden die
+    Verweise auf `/static/...` um `?v=<Hash>` ergänzt; Anfragen mit passendem Hash werden
+    als unveränderlich gecacht, alle anderen per ETag revalidiert (304). Mit `reload=True`
+    (Entwicklung) wird bei jeder Anfrage geprüft, ob sich Dateien geändert haben.
+    """
+
+    def __init__(self, directory, index="index.html", reload=False):
+        self.directory = directory
+        self.index = index
+        self.reload = reload
+        self.assets = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def _scan(self):
+        mtimes = {}
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(root, file)
+                mtimes[os.path.relpath(path, self.directory).replace(os.sep, "/")] = os.stat(path).st_mtime_ns
+        return mtimes
+
+    def load(self, mtimes=None):
+        mtimes = self._scan() if mtimes is None else mtimes
+        assets = {}
+        for name, mtime in mtimes.items():
+            with open(os.path.join(self.directory, name), "rb") as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if content_type.startswith("text/") or content_type == "application/javascript":
+                content_type += "; charset=utf-8"
+            assets[name] = Asset(body, content_type, mtime)
+
+        index = assets.get(self.index)
+        if index is not None:
+            # Verweise auf statische Dateien mit dem Inhalts-Hash versionieren
+            def versioned(match):
+                asset = assets.get(match.group(2))
+                suffix = f"?v={asset.digest}" if asset is not None else ""
+                return f"{match.group(1)}/static/{match.group(2)}{suffix}{match.group(3)}"
+
+            html = STATIC_REF_RE.sub(versioned, index.body.decode("utf-8"))
+            assets[self.index] = Asset(html.encode("utf-8"), index.content_type, index.mtime)
+        self.assets = assets
+
+    def get(self, name):
+        if self.reload:
+            mtimes = self._scan()
+            if mtimes != {key: asset.mtime for key, asset in self.assets.items()}:
+                with self._lock:
+                    self.load(mtimes)
+        return self.assets.get(name)
+
+    def response(self, request: Request, name: str) -> Response:
+        asset = self.get(name)
+        if asset is None:
+            return Response(status_code=404)
+
+        version = request.query_params.get("v")
+        cache_control = IMMUTABLE_CACHE if version == asset.digest and name != self.index else REVALIDATE_CACHE
+        encoding = _negotiate(request.headers.get("accept-encoding", ""), asset.variants)
+        etag = f'"{asset.digest}-{encoding}"' if encoding else f'"{asset.digest}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        # Jede Darstellung desselben Inhalts (unkomprimiert, gzip, br) gilt als aktuell
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or asset.digest in _etag_digests(if_none_match)):
+            return Response(status_code=304, headers=headers)
+
+        body = asset.variants[encoding] if encoding else asset.body
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.content_type, headers=headers)
+
+
+def _etag_digests(header):
+    """Inhalts-Hashes aus einem If-None-Match-Header (ohne W/-Präfix und Encoding-Suffix)."""
+    return {tag.strip().removeprefix("W/").strip('"').split("-")[0] for tag in header.split(",")}
+
+
+def _negotiate(accept_encoding, variants):
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip())
+    for encoding in ("br", "gzip"):
+        if encoding in variants and encoding in accepted:
+            return encoding
+    return None
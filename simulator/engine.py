@@ -0,0 +1,48 @@
+import asyncio
+
+
+class StateEngine:
+    """Führt alle Änderungen einer Show nacheinander aus – ein Schreiber je Show.
+
+    Die Endpunkte laufen direkt auf dem Event-Loop. Je Show reiht eine `asyncio.Lock`
+    die Transaktionen in Eingangsreihenfolge ein; mit dem Speicher im Prozess läuft die
+    Transaktion ohne Thread-Wechsel auf dem Event-Loop. Nur bei einem gemeinsamen
+    Speicher (SQLite, mehrere Worker) wird sie in einen Thread ausgelagert, damit das
+    Warten auf die Schreibsperre anderer Prozesse den Event-Loop nicht blockiert.
+    """
+
+    def __init__(self, backend, feed):
+        self.backend = backend
+        self.feed = feed
+        self.writers = {}  # Show -> [Schreibsperre, Anzahl laufender/wartender Transaktionen]
+
+    def _commit(self, show, change):
+        with self.backend.transaction(show) as tx:
+            change(tx)
+        return tx
+
+    async def run(self, show, change):
+        """Führt `change(tx)` als Transaktion der Show aus und gibt die Transaktion zurück."""
+        writer = self.writers.get(show)
+        if writer is None:
+            writer = self.writers[show] = [asyncio.Lock(), 0]
+        writer[1] += 1
+        try:
+            async with writer[0]:
+                if self.backend.shared:
+                    tx = await asyncio.to_thread(self._commit, show, change)
+                else:
+                    tx = self._commit(show, change)
+        finally:
+            # Sperre nur so lange halten, wie Transaktionen der Show anstehen
+            writer[1] -= 1
+            if not writer[1]:
+                del self.writers[show]
+        self.feed.deliver(show, tx.events)
+        return tx
+
+    async def read(self, method, *args):
+        """Lesezugriff auf den Speicher (bei gemeinsamem Speicher in einem Thread)."""
+        if self.backend.shared:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
@@ -0,0 +1,126 @@
+import json
+import asyncio
+import threading
+from collections import defaultdict
+
+
+KEEPALIVE_INTERVAL = 15
+SUBSCRIBER_QUEUE_SIZE = 256
+POLL_INTERVAL = 0.1  # Sekunden; nur bei gemeinsam genutztem Zustandsspeicher (mehrere Worker)
+
+
+class ChangeFeed:
+    """Verteilt die Änderungen je Show an die SSE-Abonnenten dieses Prozesses.
+
+    Eigene Commits werden direkt zugestellt. Bei einem gemeinsam genutzten Speicher
+    (mehrere Worker) holt `poll` zusätzlich die Änderungen der anderen Prozesse nach;
+    Lücken werden immer aus dem Änderungs-Log des Speichers aufgefüllt, sodass jeder
+    Abonnent die Revisionen lückenlos und in Reihenfolge erhält.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.subscribers = defaultdict(set)  # Show -> {(Event-Loop, Queue)}
+        self.delivered = {}  # Show -> zuletzt zugestellte Revision
+        self.lock = threading.Lock()
+
+    def deliver(self, show, events):
+        """Stellt Änderungen einer Show zu (nach dem Commit aufrufen)."""
+        with self.lock:
+            last = self.delivered.get(show)
+            if last is None:
+                return  # Keine Abonnenten für diese Show
+            if not events or events[0]["revision"] > last + 1:
+                # Änderungen eines anderen Workers (oder Threads) fehlen noch: aus dem Log nachladen
+                events = self.backend.changes_since(show, last)
+                if events is None:
+                    self._send(show, None)  # Nicht mehr im Log: Snapshot erzwingen
+                    self.delivered[show] = self.backend.revision(show)
+                    return
+            for event in events:
+                if event["revision"] > last:
+                    self._send(show, event)
+                    last = event["revision"]
+            self.delivered[show] = last
+
+    def pump(self, show):
+        """Holt Änderungen anderer Prozesse nach, falls die Revision im Speicher weiter ist."""
+        last = self.delivered.get(show)
+        if last is not None and self.backend.revision(show) > last:
+            self.deliver(show, [])
+
+    async def poll(self, interval=POLL_INTERVAL):
+        """Fragt den gemeinsamen Speicher regelmäßig nach neuen Revisionen (läuft bis zum Abbruch)."""
+        while True:
+            await asyncio.sleep(interval)
+            for show in list(self.subscribers):
+                await asyncio.to_thread(self.pump, show)
+
+    def _send(self, show, event):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop, queue in list(self.subscribers[show]):
+            if loop is running:
+                _deliver(queue, event)  # Commit auf dem eigenen Event-Loop: ohne Umweg zustellen
+                continue
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, event)
+            except RuntimeError:
+                self.subscribers[show].discard((loop, queue))  # Event-Loop bereits geschlossen
+
+    def _snapshot(self, show):
+        revision, sequences = self.backend.snapshot(show)
+        return {"revision": revision, "type": "snapshot", "sequences": sequences}
+
+    async def stream(self, show, last_revision):
+        """SSE-Stream einer Show: Snapshot bzw. verpasste Änderungen, danach jede neue Änderung."""
+        loop = asyncio.get_running_loop()
+        subscriber = (loop, asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self.lock:
+            if show not in self.delivered:
+                self.delivered[show] = self.backend.revision(show)
+            self.subscribers[show].add(subscriber)
+            # Nach einem Reconnect nur die verpassten Änderungen senden, sofern sie noch im Log sind
+            initial = None if last_revision is None else self.backend.changes_since(show, last_revision)
+            if initial is None:
+                initial = [self._snapshot(show)]
+        sent = last_revision if last_revision is not None else 0
+        try:
+            for event in initial:
+                sent = event["revision"]
+                yield _sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber[1].get(), timeout=KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    event = self._snapshot(show)
+                elif event["revision"] <= sent:
+                    continue  # Bereits im Snapshot bzw. Nachlade-Block enthalten
+                sent = event["revision"]
+                yield _sse(event)
+        finally:
+            with self.lock:
+                self.subscribers[show].discard(subscriber)
+                if not self.subscribers[show]:
+                    del self.subscribers[show]
+                    self.delivered.pop(show, None)
+
+
+def _deliver(queue: asyncio.Queue, event: dict | None):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Client kommt nicht hinterher: Warteschlange verwerfen und neuen Snapshot erzwingen
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+def _sse(event: dict) -> str:
+    kind = "snapshot" if event["type"] == "snapshot" else "change"
+    return f"id: {event['revision']}\nevent: {kind}\ndata: {json.dumps(event)}\n\n"
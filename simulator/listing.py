@@ -0,0 +1,45 @@
+import json
+from collections import OrderedDict
+
+
+MAX_ENTRIES_PER_SHOW = 64
+
+
+class ListingCache:
+    """Fertig serialisierte Antworten von `GET .../sequences` je Show und Abfrage.
+
+    Einträge gelten nur für die Revision, zu der sie erzeugt wurden; jede Änderung der Show
+    (auch durch einen anderen Worker) macht sie ungültig. Solange sich nichts ändert, kostet
+    eine Abfrage – auch einer großen Show – nur das Lesen der Revision.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES_PER_SHOW):
+        self.max_entries = max_entries
+        self.shows = {}  # Show -> (Revision, OrderedDict Abfrage -> (Body, nächster Cursor))
+
+    def get(self, show, revision, query):
+        cached = self.shows.get(show)
+        if cached is None or cached[0] != revision:
+            return None
+        entry = cached[1].get(query)
+        if entry is not None:
+            cached[1].move_to_end(query)
+        return entry
+
+    def put(self, show, revision, query, body, next_cursor):
+        cached = self.shows.get(show)
+        if cached is None or cached[0] != revision:
+            if cached is not None and cached[0] > revision:
+                return  # Ergebnis ist bereits veraltet
+            cached = self.shows[show] = (revision, OrderedDict())
+        entries = cached[1]
+        entries[query] = (body, next_cursor)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+
+def serialize(rows) -> bytes:
+    """Serialisiert Zeilen (laufende Nummer, Name, Status) ohne Umweg über Pydantic."""
+    return json.dumps(
+        [{"name": name, "status": status} for _, name, status in rows], separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
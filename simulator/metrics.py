@@ -0,0 +1,32 @@
+import time
+import threading
+from controller.metrics import Histogram
+
+
+class RouteTimings:
+    """Antwortzeiten je Route und Methode als Histogramm im Prometheus-Textformat."""
+
+    def __init__(self, name="simulator_request_duration_ms"):
+        self.histogram = Histogram(name, "Antwortzeit des Simulators je Route in ms.")
+        self.lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, value_ms: float):
+        with self.lock:
+            self.histogram.observe(value_ms, method=method, route=route, status=status)
+
+    def render(self) -> str:
+        with self.lock:
+            return "\n".join(self.histogram.render()) + "\n"
+
+
+route_timings = RouteTimings()
+
+
+async def timing_middleware(request, call_next):
+    """Misst die Antwortzeit jeder Anfrage und ordnet sie der Routen-Vorlage zu (z. B. /api/sequences/{name})."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    route_timings.observe(request.method, route_path, response.status_code, (time.perf_counter() - start) * 1000)
+    return response
@@ -0,0 +1,456 @@
+import json
+import heapq
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+# Anzahl Änderungen je Show, die für Reconnects des Änderungs-Feeds vorgehalten werden
+CHANGE_LOG_SIZE = 1000
+
+
+class ConflictError(Exception):
+    """Eine Sequenz wurde zwischen Lesen und Schreiben verändert (Compare-and-Set fehlgeschlagen)."""
+
+
+class Transaction:
+    """Änderungen an einer Show, die erst beim Commit sichtbar werden (alles oder nichts).
+
+    Geänderte Sequenzen werden in `writes` gesammelt (Status `None` = gelöscht); daraus
+    erzeugt der Commit die Einträge für den Änderungs-Feed. Lesezugriffe sehen die eigenen
+    Änderungen bereits vor dem Commit.
+    """
+
+    def __init__(self):
+        self.writes = {}  # Name -> neuer Status, in Reihenfolge der ersten Änderung
+        self.expected = {}  # Name -> Status vor der Transaktion (für Compare-and-Set)
+        self.cleared = False
+        self.events = []
+        self.modified = {}  # Name -> Revision der Änderung (nach dem Commit)
+        self.revision = None
+
+    def _load(self, name):
+        raise NotImplementedError
+
+    def _holders(self, statuses):
+        raise NotImplementedError
+
+    def status(self, name):
+        if name in self.writes:
+            return self.writes[name]
+        return None if self.cleared else self._load(name)
+
+    def holder(self, *statuses):
+        """Name einer Sequenz mit einem der Status oder None."""
+        for name, status in self.writes.items():
+            if status in statuses:
+                return name
+        if not self.cleared:
+            for name in self._holders(statuses):
+                if name not in self.writes:
+                    return name
+        return None
+
+    def put(self, name, status):
+        self.expected.setdefault(name, self.status(name))
+        self.writes[name] = status
+
+    def delete(self, name):
+        self.put(name, None)
+
+    def compare_and_set(self, name, expected, status):
+        """Setzt den Status nur, wenn die Sequenz noch `expected` ist."""
+        if self.status(name) != expected:
+            return False
+        self.put(name, status)
+        return True
+
+    def clear(self):
+        """Löscht alle Sequenzen der Show."""
+        self.writes.clear()
+        self.expected.clear()
+        self.cleared = True
+
+    def _build_events(self, revision):
+        kinds = [("reset", None, None)] if self.cleared else []
+        for name, status in self.writes.items():
+            if status is None:
+                kinds.append(("delete", name, None))
+            else:
+                kinds.append(("update", name, status))
+        for offset, (kind, name, status) in enumerate(kinds, start=1):
+            event = {"revision": revision + offset, "type": kind}
+            if kind == "update":
+                event["sequence"] = {"name": name, "status": status}
+                self.modified[name] = event["revision"]
+            elif kind == "delete":
+                event["name"] = name
+            self.events.append(event)
+        self.revision = revision + len(kinds)
+        return self.events
+
+
+class _MemoryShow:
+    def __init__(self):
+        self.statuses = {}
+        self.index = defaultdict(list)  # Status -> laufende Nummern (sortiert)
+        self.order = []  # Laufende Nummern aller Sequenzen (sortiert, Anlage-Reihenfolge)
+        self.names = {}  # Laufende Nummer -> Name
+        self.meta = {}  # Name -> (laufende Nummer für die Reihenfolge, Revision der letzten Änderung)
+        self.next_id = 1
+        self.revision = 0
+        self.change_log = deque(maxlen=CHANGE_LOG_SIZE)
+        self.lock = threading.RLock()
+
+
+class _MemoryTransaction(Transaction):
+    def __init__(self, show):
+        super().__init__()
+        self.show = show
+
+    def _load(self, name):
+        return self.show.statuses.get(name)
+
+    def _holders(self, statuses):
+        for status in statuses:
+            for row_id in self.show.index.get(status, ()):
+                yield self.show.names[row_id]
+
+    def commit(self):
+        show = self.show
+        self._build_events(show.revision)
+        if self.cleared:
+            show.statuses.clear()
+            show.index.clear()
+            show.order.clear()
+            show.names.clear()
+            show.meta.clear()
+        for name, status in self.writes.items():
+            old = show.statuses.get(name)
+            if old is not None:
+                row_id = show.meta[name][0]
+                _remove(show.index[old], row_id)
+            if status is None:
+                if old is not None:
+                    _remove(show.order, row_id)
+                    del show.names[row_id]
+                show.statuses.pop(name, None)
+                show.meta.pop(name, None)
+                continue
+            show.statuses[name] = status
+            if old is None:
+                row_id = show.next_id
+                show.next_id += 1
+                show.order.append(row_id)  # Nummern steigen, die Liste bleibt sortiert
+                show.names[row_id] = name
+            insort(show.index[status], row_id)
+            show.meta[name] = (row_id, self.modified[name])
+        show.revision = self.revision
+        show.change_log.extend(self.events)
+
+
+def _remove(ids, row_id):
+    del ids[bisect_left(ids, row_id)]
+
+
+def _tail(ids, after):
+    """Nummern einer sortierten Liste hinter `after`, ohne die davor zu durchlaufen."""
+    start = 0 if after is None else bisect_right(ids, after)
+    return (ids[i] for i in range(start, len(ids)))
+
+
+class MemoryBackend:
+    """Zustand im Speicher des Prozesses – schnell, aber nur für einen einzelnen Worker."""
+
+    shared = False
+
+    def __init__(self):
+        self._shows = {}
+        self._empty = _MemoryShow()  # Lesezugriffe auf unbekannte Shows (wird nie beschrieben)
+        self._lock = threading.Lock()
+
+    def _show(self, show):
+        return self._shows.get(show, self._empty)
+
+    @contextmanager
+    def transaction(self, show):
+        # Shows entstehen nur durch Schreibzugriffe; scheitert der erste, wird die Show
+        # wieder entfernt (wie das Zurückrollen von `INSERT INTO shows` bei SQLite)
+        with self._lock:
+            state = self._shows.get(show)
+            created = state is None
+            if created:
+                state = self._shows[show] = _MemoryShow()
+        try:
+            with state.lock:
+                tx = _MemoryTransaction(state)
+                yield tx
+                tx.commit()
+        except BaseException:
+            if created:
+                with self._lock:
+                    if self._shows.get(show) is state and state.revision == 0:
+                        del self._shows[show]
+            raise
+
+    def shows(self):
+        return [{"name": name, "revision": state.revision} for name, state in list(self._shows.items())]
+
+    def revision(self, show):
+        return self._show(show).revision
+
+    def status(self, show, name):
+        return self._show(show).statuses.get(name)
+
+    def snapshot(self, show):
+        state = self._show(show)
+        with state.lock:
+            return state.revision, [{"name": name, "status": status} for name, status in state.statuses.items()]
+
+    def query(self, show, statuses=None, since=None, after=None, limit=None):
+        """Sequenzen in Anlage-Reihenfolge, optional gefiltert; gibt (Revision, Zeilen, weitere?) zurück.
+
+        Zeilen sind (laufende Nummer, Name, Status). Mit `statuses` werden nur die Sequenzen
+        aus dem Status-Index gelesen, `since` filtert nach der Revision der letzten Änderung
+        und `after` setzt hinter der laufenden Nummer einer vorherigen Seite fort.
+        """
+        state = self._show(show)
+        with state.lock:
+            meta, names = state.meta, state.names
+            # Sortierte Nummern-Listen: der Cursor springt per Binärsuche an die Fortsetzung
+            sources = [state.order] if statuses is None else [state.index.get(s, ()) for s in dict.fromkeys(statuses)]
+            seeked = [_tail(ids, after) for ids in sources]
+            row_ids = seeked[0] if len(seeked) == 1 else heapq.merge(*seeked)
+            rows = []
+            for row_id in row_ids:
+                name = names[row_id]
+                if since is not None and meta[name][1] <= since:
+                    continue
+                if limit is not None and len(rows) == limit:
+                    return state.revision, rows, True
+                rows.append((row_id, name, state.statuses[name]))
+            return state.revision, rows, False
+
+    def changes_since(self, show, revision):
+        """Änderungen nach `revision` oder None, wenn sie nicht mehr im Log sind."""
+        state = self._show(show)
+        with state.lock:
+            if state.revision == revision:
+                return []
+            log = state.change_log
+            if revision > state.revision or not log or log[0]["revision"] > revision + 1:
+                return None
+            return [event for event in log if event["revision"] > revision]
+
+
+class _SQLiteTransaction(Transaction):
+    def __init__(self, connection, show):
+        super().__init__()
+        self.connection = connection
+        self.show = show
+
+    def _load(self, name):
+        row = self.connection.execute(
+            "SELECT status FROM sequences WHERE show = ? AND name = ?", (self.show, name)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _holders(self, statuses):
+        marks = ", ".join("?" * len(statuses))
+        rows = self.connection.execute(
+            f"SELECT name FROM sequences WHERE show = ? AND status IN ({marks}) ORDER BY rowid",
+            (self.show, *statuses),
+        )
+        return [name for (name,) in rows]
+
+    def commit(self):
+        db = self.connection
+        db.execute("INSERT OR IGNORE INTO shows (name) VALUES (?)", (self.show,))
+        (revision,) = db.execute("SELECT revision FROM shows WHERE name = ?", (self.show,)).fetchone()
+        self._build_events(revision)
+        if self.cleared:
+            db.execute("DELETE FROM sequences WHERE show = ?", (self.show,))
+        for name, status in self.writes.items():
+            expected = self.expected[name]
+            try:
+                if status is None:
+                    cursor = db.execute(
+                        "DELETE FROM sequences WHERE show = ? AND name = ? AND status IS ?", (self.show, name, expected)
+                    )
+                elif expected is None:
+                    cursor = db.execute(
+                        "INSERT INTO sequences (show, name, status, modified) VALUES (?, ?, ?, ?)",
+                        (self.show, name, status, self.modified[name]),
+                    )
+                else:
+                    cursor = db.execute(
+                        "UPDATE sequences SET status = ?, modified = ? WHERE show = ? AND name = ? AND status = ?",
+                        (status, self.modified[name], self.show, name, expected),
+                    )
+            except sqlite3.IntegrityError:
+                raise ConflictError(f"Sequence {name} was changed concurrently.") from None
+            if cursor.rowcount != 1 and not (status is None and expected is None):
+                raise ConflictError(f"Sequence {name} was changed concurrently.")
+        db.executemany(
+            "INSERT INTO changes (show, revision, event) VALUES (?, ?, ?)",
+            [(self.show, event["revision"], json.dumps(event)) for event in self.events],
+        )
+        db.execute("UPDATE shows SET revision = ? WHERE name = ?", (self.revision, self.show))
+        db.execute(
+            "DELETE FROM changes WHERE show = ? AND revision <= ?", (self.show, self.revision - CHANGE_LOG_SIZE)
+        )
+
+
+class SQLiteBackend:
+    """Zustand in einer SQLite-Datei im WAL-Modus – gemeinsam für mehrere Worker-Prozesse.
+
+    Schreibende Transaktionen beginnen mit `BEGIN IMMEDIATE` und sind damit über alle
+    Prozesse serialisiert; jede Statusänderung wird zusätzlich als Compare-and-Set auf den
+    zuvor gelesenen Status geschrieben. Ein eindeutiger Teilindex stellt sicher, dass jede
+    Freigabestufe und 'running' höchstens von einer Sequenz je Show belegt sind.
+    """
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._connect()
+        try:
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS shows (
+                    name TEXT PRIMARY KEY,
+                    revision INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS sequences (
+                    show TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    modified INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (show, name)
+                );
+                CREATE INDEX IF NOT EXISTS sequences_by_status ON sequences (show, status);
+                CREATE UNIQUE INDEX IF NOT EXISTS sequences_single_stage ON sequences (show, status)
+                    WHERE status IN ('first_stage', 'second_stage', 'running');
+                CREATE TABLE IF NOT EXISTS changes (
+                    show TEXT NOT NULL,
+                    revision INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (show, revision)
+                );
+                """
+            )
+            # Dateien aus älteren Ständen ohne Änderungs-Revision je Sequenz
+            if "modified" not in [column[1] for column in db.execute("PRAGMA table_info(sequences)")]:
+                db.execute("ALTER TABLE sequences ADD COLUMN modified INTEGER NOT NULL DEFAULT 0")
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _connection(self):
+        # sqlite3-Verbindungen dürfen nicht zwischen Threads geteilt werden
+        db = getattr(self._local, "connection", None)
+        if db is None:
+            db = self._local.connection = self._connect()
+        return db
+
+    @contextmanager
+    def transaction(self, show):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            tx = _SQLiteTransaction(db, show)
+            yield tx
+            tx.commit()
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @contextmanager
+    def _read(self):
+        db = self._connection()
+        db.execute("BEGIN")  # Konsistenter Lese-Snapshot (WAL)
+        try:
+            yield db
+        finally:
+            db.execute("COMMIT")
+
+    def shows(self):
+        rows = self._connection().execute("SELECT name, revision FROM shows ORDER BY name")
+        return [{"name": name, "revision": revision} for name, revision in rows]
+
+    def revision(self, show):
+        row = self._connection().execute("SELECT revision FROM shows WHERE name = ?", (show,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def status(self, show, name):
+        row = self._connection().execute(
+            "SELECT status FROM sequences WHERE show = ? AND name = ?", (show, name)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def snapshot(self, show):
+        with self._read() as db:
+            row = db.execute("SELECT revision FROM shows WHERE name = ?", (show,)).fetchone()
+            rows = db.execute("SELECT name, status FROM sequences WHERE show = ? ORDER BY rowid", (show,))
+            return (0 if row is None else row[0]), [{"name": name, "status": status} for name, status in rows]
+
+    def query(self, show, statuses=None, since=None, after=None, limit=None):
+        """Sequenzen in Anlage-Reihenfolge, optional gefiltert; gibt (Revision, Zeilen, weitere?) zurück."""
+        sql = "SELECT rowid, name, status FROM sequences WHERE show = ?"
+        params = [show]
+        if statuses is not None:
+            sql += f" AND status IN ({', '.join('?' * len(statuses))})"
+            params += statuses
+        if since is not None:
+            sql += " AND modified > ?"
+            params.append(since)
+        if after is not None:
+            sql += " AND rowid > ?"
+            params.append(after)
+        sql += " ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        with self._read() as db:
+            row = db.execute("SELECT revision FROM shows WHERE name = ?", (show,)).fetchone()
+            rows = db.execute(sql, params).fetchall()
+        more = limit is not None and len(rows) > limit
+        return (0 if row is None else row[0]), rows[:limit] if more else rows, more
+
+    def changes_since(self, show, revision):
+        """Änderungen nach `revision` oder None, wenn sie nicht mehr im Log sind."""
+        with self._read() as db:
+            row = db.execute("SELECT revision FROM shows WHERE name = ?", (show,)).fetchone()
+            current = 0 if row is None else row[0]
+            if current == revision:
+                return []
+            if revision > current:
+                return None
+            events = [
+                json.loads(event)
+                for (event,) in db.execute(
+                    "SELECT event FROM changes WHERE show = ? AND revision > ? ORDER BY revision", (show, revision)
+                )
+            ]
+        if not events or events[0]["revision"] != revision + 1:
+            return None
+        return events
+
+
+def open_backend(url):
+    """Erzeugt den Zustandsspeicher aus `SIMULATOR_STATE`: 'memory' oder 'sqlite:<Pfad>'."""
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:"):
+        return SQLiteBackend(url[len("sqlite:"):])
+    raise ValueError(f"Unbekannter Zustandsspeicher: {url}")
@@ -0,0 +1,78 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from simulator import app as simulator
+from simulator.engine import StateEngine
+from simulator.feed import ChangeFeed
+from simulator.listing import ListingCache
+from simulator.state import MemoryBackend, SQLiteBackend
+
+
+SEQUENCES = 12
+ROUNDS = 5
+SINGLE_STATUS = ("first_stage", "second_stage", "running")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def app(request, monkeypatch, tmp_path):
+    """Simulator-App mit frischem Zustandsspeicher des jeweiligen Backends."""
+    backend = MemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "state.db"))
+    feed = ChangeFeed(backend)
+    monkeypatch.setattr(simulator, "backend", backend)
+    monkeypatch.setattr(simulator, "feed", feed)
+    monkeypatch.setattr(simulator, "engine", StateEngine(backend, feed))
+    monkeypatch.setattr(simulator, "listing_cache", ListingCache())
+    return simulator.app
+
+
+def assert_single_holders(sequences):
+    counts = Counter(sequence["status"] for sequence in sequences)
+    for status in SINGLE_STATUS:
+        assert counts[status] <= 1, f"{counts[status]} Sequenzen in {status}: {sequences}"
+
+
+async def fire(client, name):
+    """Durchläuft für eine Sequenz beide Freigaben und startet sie (stoppt dabei die laufende)."""
+    await client.patch(f"/api/sequences/{name}/first_stage")
+    await client.patch(f"/api/sequences/{name}/second_stage")
+    await client.post("/api/sequences/transitions", json=[
+        {"action": "stop"},
+        {"action": "start", "name": name, "expect": ["second_stage", "paused"]},
+    ])
+
+
+async def watch(client, done):
+    """Prüft den Zustand fortlaufend, solange die Befehle laufen."""
+    while not done.is_set():
+        response = await client.get("/api/sequences")
+        assert_single_holders(response.json())
+        await asyncio.sleep(0)
+
+
+async def race(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://simulator") as client:
+        started = 0
+        for _ in range(ROUNDS):
+            await client.delete("/api/sequences")
+            names = [f"cue-{index}" for index in range(SEQUENCES)]
+            await asyncio.gather(*(client.post("/api/sequences", params={"name": name}) for name in names))
+
+            done = asyncio.Event()
+            watcher = asyncio.create_task(watch(client, done))
+            await asyncio.gather(*(fire(client, name) for name in names))
+            done.set()
+            await watcher
+
+            sequences = (await client.get("/api/sequences")).json()
+            assert_single_holders(sequences)
+            started += any(sequence["status"] == "running" for sequence in sequences)
+        return started
+
+
+def test_concurrent_starts_keep_single_holders(app):
+    started = asyncio.run(race(app))
+    assert started == ROUNDS  # Jede Runde endet mit genau einer laufenden Sequenz
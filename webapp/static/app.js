@@ -12,11 +12,14 @@ const CONFIG = {
     ONTIME_WS_URL: 'ws://localhost:4001/ws', // Ontime WebSocket URL
     
     // Feuerwerkssteuerung HTTP-Schnittstelle
-    FIREWORKS_API_URL: 'http://localhost:8000/api', // URL zur Feuerwerkssteuerung
+    // Mit ?show=<Name> in der Adresszeile wird eine andere Show des Simulators angezeigt
+    FIREWORKS_API_URL: new URLSearchParams(window.location.search).has('show')
+        ? `http://localhost:8000/api/shows/${encodeURIComponent(new URLSearchParams(window.location.search).get('show'))}/sequences`
+        : 'http://localhost:8000/api/sequences', // URL zur Feuerwerkssteuerung
     
     // Aktualisierungsintervalle (in ms)
     UPDATE_INTERVAL: 1000, // Interval für Clock-Updates
-    FIREWORKS_POLL_INTERVAL: 2000, // Interval für Feuerwerkssequenz-Updates
+    FIREWORKS_POLL_INTERVAL: 2000, // Fallback-Polling, falls der Browser kein EventSource kann
 };
 
 // Globale Variablen
@@ -25,6 +28,8 @@ let eventsList = [];
 let currentEventId = null;
 let messagesList = [];
 let fireworkSequences = [];
+let fireworksEventSource = null;
+let sequencesRevision = 0;
 
 // DOM Elements
 const elements = {
@@ -261,7 +266,7 @@ function sendMessageToOntime(message, level = 'info') {
  */
 async function fetchFireworkSequences() {
     try {
-        const response = await fetch(`${CONFIG.FIREWORKS_API_URL}/`);
+        const response = await fetch(CONFIG.FIREWORKS_API_URL);
         
         if (!response.ok) {
             throw new Error(`HTTP Fehler: ${response.status}`);
@@ -277,12 +282,75 @@ async function fetchFireworkSequences() {
     }
 }
 
+/**
+ * Abonniert den Änderungs-Feed der Feuerwerkssteuerung (Server-Sent Events).
+ * Der Server sendet zuerst einen Snapshot und danach nur noch einzelne Änderungen.
+ */
+function initFireworksEventStream() {
+    if (fireworksEventSource) {
+        fireworksEventSource.close();
+    }
+
+    fireworksEventSource = new EventSource(`${CONFIG.FIREWORKS_API_URL}/events`);
+
+    fireworksEventSource.addEventListener('snapshot', (event) => {
+        const snapshot = JSON.parse(event.data);
+        fireworkSequences = snapshot.sequences;
+        sequencesRevision = snapshot.revision;
+        renderSequencesList();
+    });
+
+    fireworksEventSource.addEventListener('change', (event) => {
+        applySequenceChange(JSON.parse(event.data));
+    });
+
+    fireworksEventSource.onerror = () => {
+        // EventSource verbindet sich selbst neu und sendet dabei die letzte Revision mit
+        addMessage('warning', 'Verbindung zur Feuerwerkssteuerung unterbrochen');
+    };
+}
+
+/**
+ * Wendet eine einzelne Änderung aus dem Feed auf die lokale Sequenzliste an
+ */
+function applySequenceChange(change) {
+    if (change.revision <= sequencesRevision) {
+        return; // bereits bekannt
+    }
+    if (change.revision !== sequencesRevision + 1) {
+        // Lücke im Feed: neu verbinden, der Server schickt dann einen Snapshot
+        initFireworksEventStream();
+        return;
+    }
+
+    switch (change.type) {
+        case 'update': {
+            const index = fireworkSequences.findIndex(seq => seq.name === change.sequence.name);
+            if (index === -1) {
+                fireworkSequences.push(change.sequence);
+            } else {
+                fireworkSequences[index] = change.sequence;
+            }
+            break;
+        }
+        case 'delete':
+            fireworkSequences = fireworkSequences.filter(seq => seq.name !== change.name);
+            break;
+        case 'reset':
+            fireworkSequences = [];
+            break;
+    }
+
+    sequencesRevision = change.revision;
+    renderSequencesList();
+}
+
 /**
  * Erstellt eine neue Feuerwerkssequenz
  */
 async function createSequence(name) {
     try {
-        const response = await fetch(`${CONFIG.FIREWORKS_API_URL}/?name=${encodeURIComponent(name)}`, {
+        const response = await fetch(`${CONFIG.FIREWORKS_API_URL}?name=${encodeURIComponent(name)}`, {
             method: 'POST'
         });
         
@@ -292,7 +360,6 @@ async function createSequence(name) {
         
         const newSequence = await response.json();
         addMessage('info', `Neue Sequenz "${name}" erstellt`);
-        fetchFireworkSequences(); // Aktualisiere die Liste
         
         return newSequence;
     } catch (error) {
@@ -316,7 +383,6 @@ async function deleteSequence(name) {
         }
         
         addMessage('info', `Sequenz "${name}" gelöscht`);
-        fetchFireworkSequences();
     } catch (error) {
         console.error('Fehler beim Löschen der Sequenz:', error);
         addMessage('error', `Sequenzlöschung fehlgeschlagen: ${error.message}`);
@@ -337,7 +403,6 @@ async function setSequenceToFirstStage(name) {
         }
         
         addMessage('info', `Erste Freigabe für "${name}" aktiviert`);
-        fetchFireworkSequences();
         
         // Warnung an ontime senden (30 Sekunden vor Start)
         sendMessageToOntime(`Erste Freigabe für "${name}" aktiviert (30 Sekunden verbleibend)`, 'warning');
@@ -362,7 +427,6 @@ async function setSequenceToSecondStage(name) {
         }
         
         addMessage('warning', `Zweite Freigabe für "${name}" aktiviert`);
-        fetchFireworkSequences();
         
         // Warnung an ontime senden (10 Sekunden vor Start)
         sendMessageToOntime(`Zweite Freigabe für "${name}" aktiviert (10 Sekunden verbleibend)`, 'danger');
@@ -387,7 +451,6 @@ async function startSequence(name) {
         }
         
         addMessage('success', `Sequenz "${name}" gestartet`);
-        fetchFireworkSequences();
     } catch (error) {
         console.error('Fehler beim Starten der Sequenz:', error);
         addMessage('error', `Sequenzstart fehlgeschlagen: ${error.message}`);
@@ -409,7 +472,6 @@ async function pauseSequence(name) {
         }
         
         addMessage('info', `Sequenz "${name}" pausiert`);
-        fetchFireworkSequences();
     } catch (error) {
         console.error('Fehler beim Pausieren der Sequenz:', error);
         addMessage('error', `Sequenzpause fehlgeschlagen: ${error.message}`);
@@ -431,7 +493,6 @@ async function resumeSequence(name) {
         }
         
         addMessage('success', `Sequenz "${name}" fortgesetzt`);
-        fetchFireworkSequences();
     } catch (error) {
         console.error('Fehler beim Fortsetzen der Sequenz:', error);
         addMessage('error', `Sequenzfortsetzung fehlgeschlagen: ${error.message}`);
@@ -465,9 +526,6 @@ async function executeEmergencyStop() {
             ontimeWebSocket.send(JSON.stringify(data));
         }
         
-        // Aktualisiere die Sequenzliste
-        fetchFireworkSequences();
-        
         // Benachrichtigung an alle Systeme
         sendMessageToOntime('NOTAUS wurde ausgelöst! Alle Sequenzen wurden gestoppt.', 'danger');
         
@@ -485,7 +543,7 @@ async function executeEmergencyStop() {
  */
 async function resetSystem() {
     try {
-        const response = await fetch(`${CONFIG.FIREWORKS_API_URL}/`, {
+        const response = await fetch(CONFIG.FIREWORKS_API_URL, {
             method: 'DELETE'
         });
         
@@ -494,7 +552,6 @@ async function resetSystem() {
         }
         
         addMessage('warning', 'System zurückgesetzt - alle Sequenzen gelöscht');
-        fetchFireworkSequences();
         
         // Benachrichtigung an alle Systeme
         sendMessageToOntime('Feuerwerkssteuerung wurde zurückgesetzt', 'warning');
@@ -853,9 +910,13 @@ function init() {
     // Verbinde mit ontime
     initOntimeWebSocket();
     
-    // Rufe regelmäßig die Feuerwerkssequenzen ab
-    fetchFireworkSequences();
-    setInterval(fetchFireworkSequences, CONFIG.FIREWORKS_POLL_INTERVAL);
+    // Feuerwerkssequenzen über den Änderungs-Feed aktuell halten
+    if (window.EventSource) {
+        initFireworksEventStream();
+    } else {
+        fetchFireworkSequences();
+        setInterval(fetchFireworkSequences, CONFIG.FIREWORKS_POLL_INTERVAL);
+    }
     
     // Initiale Nachricht
     addMessage('info', 'Musikfeuerwerk Webapp gestartet');